@@ -0,0 +1,120 @@
+from file_scanner import suffix_set
+from thread_budget import ThreadPlan, available_cores, MAX_AUTO_WORKERS
+from job_scheduler import COPY_COST_FACTOR, PIXEL_RATE_PER_WORKER
+from video_engine import MESSAGES, VIDEO_SUFFIXES, VideoConversionEngine, default_options as video_default_options
+
+# Video engine messages reworded for audio; translations use these keys prefixed with "audio_"
+AUDIO_WORDING = {
+    "conversion_start": "Searching for audio files...",
+    "conversion_start_log": "Starting to scan audio files...",
+    "no_video_files": "No audio files found",
+    "no_video_files_msg": "No audio files found in directory: {}",
+    "video_files_found": "Found {} audio files",
+}
+
+AUDIO_MESSAGES = dict(MESSAGES, **AUDIO_WORDING)
+AUDIO_MESSAGES["audio_format"] = "Audio format: {} ({})"
+AUDIO_MESSAGES["no_audio_stream"] = "Skipping: {} has no audio stream"
+
+AUDIO_EXTENSIONS = ['.mp3', '.flac', '.wav', '.m4a', '.aac', '.ogg', '.opus', '.wma', '.aiff']
+AUDIO_SUFFIXES = suffix_set(AUDIO_EXTENSIONS)
+
+# Per target format: file extension, source codecs that are copied as-is and encoder arguments
+AUDIO_FORMATS = {
+    "flac": {"extension": "flac", "codecs": {"flac"}, "args": ['-c:a', 'flac']},
+    "wav": {"extension": "wav", "codecs": {"pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le", "pcm_u8"},
+            "args": ['-c:a', 'pcm_s16le']},
+    "mp3": {"extension": "mp3", "codecs": {"mp3"}, "args": ['-c:a', 'libmp3lame', '-q:a', '2']},
+    "aac": {"extension": "m4a", "codecs": {"aac"}, "args": ['-c:a', 'aac', '-b:a', '192k']},
+    "opus": {"extension": "opus", "codecs": {"opus"}, "args": ['-c:a', 'libopus', '-b:a', '128k']},
+}
+OUTPUT_FORMATS = list(AUDIO_FORMATS)
+LOSSLESS_FORMATS = {"flac", "wav"}
+
+# Only the first audio track is kept; video, subtitles and cover art are never decoded
+AUDIO_MAP_ARGS = ['-map', '0:a:0', '-vn']
+
+# An audio encode runs at roughly this multiple of a 1080p video encode's speed
+AUDIO_SPEEDUP = 50
+
+
+def default_options():
+    """Options understood by AudioConversionEngine, with the GUI defaults"""
+    options = video_default_options()
+    options.update({
+        "target_format": "mp3",
+        "thread_count": available_cores(),
+        # Also take the audio track out of video files
+        "include_video_files": False,
+        # Bitrate such as "192k" for the lossy formats; empty keeps the format's default
+        "audio_bitrate": "",
+    })
+    return options
+
+
+def encoder_args(target_format, bitrate=""):
+    """Encoder arguments for a target format, with an optional bitrate for lossy formats"""
+    args = list(AUDIO_FORMATS[target_format]["args"])
+    if bitrate and target_format not in LOSSLESS_FORMATS:
+        for option in ('-q:a', '-b:a'):
+            if option in args:
+                index = args.index(option)
+                del args[index:index + 2]
+        args += ['-b:a', bitrate]
+    return args
+
+
+class AudioConversionEngine(VideoConversionEngine):
+    """Batch audio converter built on the video engine's scan, worker pool and progress
+
+    Sources are audio files and, with include_video_files, video files
+    whose first audio track is extracted. A track already in the target
+    codec is copied instead of re-encoded.
+    """
+
+    def __init__(self, ffmpeg_path, options, messages=None, **callbacks):
+        super().__init__(ffmpeg_path, options, messages or AUDIO_MESSAGES, **callbacks)
+
+    def source_suffixes(self):
+        if self.options["include_video_files"]:
+            return AUDIO_SUFFIXES | VIDEO_SUFFIXES
+        return AUDIO_SUFFIXES
+
+    def output_extension(self):
+        return AUDIO_FORMATS[self.options["target_format"]]["extension"]
+
+    def prepare_codecs(self):
+        target_format = self.options["target_format"]
+        if target_format not in AUDIO_FORMATS:
+            raise ValueError(f"Unknown audio format: {target_format}")
+        self.encoder_args = encoder_args(target_format, self.options["audio_bitrate"])
+        self.log(self.messages["audio_format"].format(target_format, " ".join(self.encoder_args)))
+
+    def plan_args(self, info):
+        codecs = AUDIO_FORMATS[self.options["target_format"]]["codecs"]
+        if info and info["audio"] and info["audio"][0]["codec"] in codecs:
+            return list(AUDIO_MAP_ARGS), ['-c:a', 'copy'], "copy"
+        return list(AUDIO_MAP_ARGS), list(self.encoder_args), "transcode"
+
+    def audio_encoder_args(self):
+        return list(self.encoder_args)
+
+    def skip_reason(self, video_file, info):
+        # Video files without sound have nothing to extract; ffmpeg would fail on the -map
+        if info is not None and not info["audio"]:
+            return self.messages["no_audio_stream"].format(video_file)
+        return None
+
+    def job_cost(self, info, mode):
+        if not info or not info.get("duration"):
+            return None
+        cost = info["duration"] * PIXEL_RATE_PER_WORKER / AUDIO_SPEEDUP
+        if mode == "copy":
+            cost *= COPY_COST_FACTOR
+        return cost
+
+    def plan_thread_budget(self, infos):
+        # Audio encoders use a single thread, so every core gets its own job
+        cores = available_cores()
+        workers = min(cores, MAX_AUTO_WORKERS) if self.options["auto_threads"] else self.options["thread_count"]
+        return ThreadPlan(cores, max(1, workers))
@@ -1,8 +1,308 @@
-import tkinter as tk
-from tkinter import ttk
-
-class AudioConverterTab(ttk.Frame):
-    def __init__(self, parent):
-        super().__init__(parent)
-        label = tk.Label(self, text="Audio conversion is under development.")
-        label.pack(pady=20)
\ No newline at end of file
+import tkinter as tk
+from tkinter import ttk, filedialog
+import os
+import json
+import queue
+import threading
+from log_sink import LogSink
+from ui_queue import UIQueueMixin
+from audio_engine import AUDIO_MESSAGES, AUDIO_WORDING, OUTPUT_FORMATS, AudioConversionEngine, default_options
+from video_engine import find_ffmpeg
+from progress_tracker import ProgressTracker
+from job_scheduler import format_duration
+from loudness import DEFAULT_TARGET
+
+# Hard-coded English language configuration
+DEFAULT_LANGUAGES = {
+    "input_folder_label": "Input Folder:",
+    "browse_button": "Browse",
+    "output_folder_label": "Output Folder:",
+    "auto_set_button": "Auto Set",
+    "output_format_label": "Output Format:",
+    "audio_bitrate_label": "Bitrate:",
+    "include_subfolders": "Include Subfolders",
+    "overwrite_existing": "Overwrite Existing Files",
+    "audio_from_video": "Extract audio from video files",
+    "normalize_loudness": "Normalize loudness (EBU R128)",
+    "audio_workers_label": "Parallel Jobs:",
+    "convert_button": "Convert",
+    "stop_button": "Stop",
+    "file_stats_label": "File Stats:",
+    "log_label": "Conversion Log:",
+    "error_no_io_folders": "Please select input and output folders.",
+    "converting_audio": "Converting...",
+    "conversion_complete": "Conversion completed.",
+    "conversion_failed": "Conversion failed",
+    "progress_overall": "{:.1f}% | ETA {}",
+}
+
+# Language name -> UI texts; the names match the language selection of the main window
+LANGUAGES = {"English": DEFAULT_LANGUAGES}
+
+# Locales directory
+LOCALES_DIR = "locales"
+
+# The audio log is kept apart from the video log, which rotates its own file
+LOG_FILE = "audio_conversion.log"
+
+
+def load_language_files():
+    try:
+        if os.path.exists(LOCALES_DIR):
+            for filename in os.listdir(LOCALES_DIR):
+                if filename.endswith(".json"):
+                    lang_code = os.path.splitext(filename)[0]
+                    try:
+                        with open(os.path.join(LOCALES_DIR, filename), 'r', encoding='utf-8') as f:
+                            LANGUAGES[lang_code] = json.load(f)
+                    except Exception as e:
+                        print(f"Failed to load {filename}: {e}")
+    except Exception as e:
+        print(f"Failed to access locales directory: {e}")
+
+
+load_language_files()
+
+# "auto" runs one job per core
+AUTO_WORKERS = "auto"
+
+# Bitrates offered for the lossy formats; empty keeps the format's default
+BITRATES = ["", "64k", "96k", "128k", "192k", "256k", "320k"]
+
+
+class AudioConverterTab(UIQueueMixin, ttk.Frame):
+    def __init__(self, parent, language=None):
+        super().__init__(parent)
+        # Tk variable holding the selected language name; None keeps English
+        self.language = language
+        self.log_sink = LogSink("audio_converter", LOG_FILE)
+        self.update_ui()
+
+    def texts(self):
+        """UI texts of the selected language"""
+        lang = self.language.get() if self.language is not None else "English"
+        return LANGUAGES.get(lang, DEFAULT_LANGUAGES)
+
+    def text(self, key):
+        """UI text in the selected language, falling back to English"""
+        return self.texts().get(key, DEFAULT_LANGUAGES[key])
+
+    def engine_messages(self):
+        """Engine log messages in the selected language; the audio wordings use "audio_" keys"""
+        texts = self.texts()
+        messages = dict(AUDIO_MESSAGES)
+        for key in messages:
+            messages[key] = texts.get("audio_" + key if key in AUDIO_WORDING else key, messages[key])
+        return messages
+
+    def update_ui(self):
+        """Create the variables and widgets of the tab"""
+        self.input_folder = tk.StringVar()
+        self.output_folder = tk.StringVar()
+        self.status = tk.StringVar(value="Ready")
+        self.output_format = tk.StringVar(value="mp3")
+        self.bitrate = tk.StringVar(value="")
+        self.include_subfolders = tk.BooleanVar(value=True)
+        self.include_video_files = tk.BooleanVar(value=False)
+        self.overwrite_existing = tk.BooleanVar(value=False)
+        self.normalize_loudness = tk.BooleanVar(value=False)
+        self.workers = tk.StringVar(value=AUTO_WORKERS)
+        self.total_files = tk.IntVar(value=0)
+        self.successful_files = tk.IntVar(value=0)
+        self.failed_files = tk.IntVar(value=0)
+        self.file_stats = tk.StringVar(value="")
+        self.progress_value = tk.DoubleVar(value=0)
+        self.progress_text = tk.StringVar(value="")
+        self.ui_queue = queue.Queue()
+        self.progress = ProgressTracker()
+        self.converting = False
+        self.engine = None
+
+        self.create_widgets()
+
+    def create_widgets(self):
+        """Create all UI widgets"""
+        for widget in self.winfo_children():
+            widget.destroy()
+
+        main_frame = ttk.Frame(self, padding=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        main_frame.columnconfigure(1, weight=1)
+        main_frame.rowconfigure(7, weight=1)
+
+        # Input and output folders
+        ttk.Label(main_frame, text=self.text("input_folder_label")).grid(row=0, column=0, sticky=tk.W)
+        ttk.Entry(main_frame, textvariable=self.input_folder).grid(row=0, column=1, padx=5, pady=5, sticky=tk.EW)
+        ttk.Button(main_frame, text=self.text("browse_button"), command=self.browse_input_folder).grid(row=0, column=2, padx=5, pady=5)
+
+        ttk.Label(main_frame, text=self.text("output_folder_label")).grid(row=1, column=0, sticky=tk.W)
+        ttk.Entry(main_frame, textvariable=self.output_folder).grid(row=1, column=1, padx=5, pady=5, sticky=tk.EW)
+        ttk.Button(main_frame, text=self.text("browse_button"), command=self.browse_output_folder).grid(row=1, column=2, padx=5, pady=5)
+        ttk.Button(main_frame, text=self.text("auto_set_button"), command=self.auto_set_output_folder).grid(row=1, column=3, padx=5, pady=5)
+
+        # Format, bitrate and parallel jobs
+        format_frame = ttk.Frame(main_frame)
+        format_frame.grid(row=2, column=0, columnspan=4, sticky=tk.W, pady=5)
+        ttk.Label(format_frame, text=self.text("output_format_label")).pack(side=tk.LEFT)
+        ttk.Combobox(format_frame, textvariable=self.output_format, values=OUTPUT_FORMATS, width=8,
+                     state="readonly").pack(side=tk.LEFT, padx=5)
+        ttk.Label(format_frame, text=self.text("audio_bitrate_label")).pack(side=tk.LEFT, padx=(15, 0))
+        ttk.Combobox(format_frame, textvariable=self.bitrate, values=BITRATES, width=6).pack(side=tk.LEFT, padx=5)
+        ttk.Label(format_frame, text=self.text("audio_workers_label")).pack(side=tk.LEFT, padx=(15, 0))
+        ttk.Combobox(format_frame, textvariable=self.workers, values=[AUTO_WORKERS, 1, 2, 4, 8, 16],
+                     width=6).pack(side=tk.LEFT, padx=5)
+
+        # Options
+        options_frame = ttk.Frame(main_frame)
+        options_frame.grid(row=3, column=0, columnspan=4, sticky=tk.W, pady=5)
+        ttk.Checkbutton(options_frame, text=self.text("include_subfolders"), variable=self.include_subfolders).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(options_frame, text=self.text("audio_from_video"), variable=self.include_video_files).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(options_frame, text=self.text("overwrite_existing"), variable=self.overwrite_existing).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(options_frame, text=self.text("normalize_loudness"), variable=self.normalize_loudness).pack(side=tk.LEFT, padx=5)
+
+        self.convert_button = ttk.Button(main_frame, text=self.text("convert_button"), command=self.start_conversion)
+        self.convert_button.grid(row=4, column=1, pady=10)
+        if self.converting:
+            self.convert_button.config(state="disabled")
+        ttk.Button(main_frame, text=self.text("stop_button"), command=self.cancel_conversion).grid(row=4, column=2, pady=10)
+
+        # Progress
+        ttk.Progressbar(main_frame, variable=self.progress_value, maximum=100).grid(
+            row=5, column=0, columnspan=4, sticky=tk.EW, pady=5)
+        ttk.Label(main_frame, textvariable=self.progress_text).grid(row=6, column=0, columnspan=4, sticky=tk.W)
+
+        # Status, file count and log
+        bottom_frame = ttk.Frame(main_frame)
+        bottom_frame.grid(row=7, column=0, columnspan=4, sticky=tk.NSEW, pady=5)
+        ttk.Label(bottom_frame, textvariable=self.status).pack(anchor=tk.W)
+        ttk.Label(bottom_frame, text=self.text("file_stats_label")).pack(anchor=tk.W)
+        ttk.Label(bottom_frame, textvariable=self.file_stats).pack(anchor=tk.W)
+        ttk.Label(bottom_frame, text=self.text("log_label")).pack(anchor=tk.W)
+        self.log_text = tk.Text(bottom_frame, width=80, height=10)
+        self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        scrollbar = ttk.Scrollbar(bottom_frame, command=self.log_text.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.log_text.config(yscrollcommand=scrollbar.set)
+        self.log_sink.attach(self.log_text)
+
+    def browse_input_folder(self):
+        """Open a dialog to select the input folder"""
+        folder = filedialog.askdirectory()
+        if folder:
+            self.input_folder.set(folder)
+            self.auto_set_output_folder()
+
+    def browse_output_folder(self):
+        """Open a dialog to select the output folder"""
+        folder = filedialog.askdirectory()
+        if folder:
+            self.output_folder.set(folder)
+
+    def auto_set_output_folder(self):
+        """Automatically set output folder based on input folder and format"""
+        input_folder = self.input_folder.get()
+        if input_folder:
+            self.output_folder.set(os.path.normpath(os.path.join(input_folder, self.output_format.get())))
+
+    def start_conversion(self):
+        """Convert the audio files in a background thread"""
+        if self.converting:
+            return
+
+        input_folder = self.input_folder.get()
+        output_folder = self.output_folder.get()
+        if not input_folder or not output_folder:
+            self.status.set(self.text("error_no_io_folders"))
+            return
+
+        workers = self.workers.get()
+        try:
+            workers = None if workers == AUTO_WORKERS else max(1, int(workers))
+        except ValueError:
+            workers = None
+
+        # Worker threads only read this snapshot, never the Tk variables
+        options = default_options()
+        options.update({
+            "input_folder": input_folder,
+            "output_folder": output_folder,
+            "target_format": self.output_format.get(),
+            "audio_bitrate": self.bitrate.get().strip(),
+            "include_video_files": self.include_video_files.get(),
+            "include_subfolders": self.include_subfolders.get(),
+            "overwrite_existing": self.overwrite_existing.get(),
+            "loudness_target": DEFAULT_TARGET if self.normalize_loudness.get() else None,
+            "thread_count": workers or 1,
+            "auto_threads": workers is None,
+        })
+
+        self.total_files.set(0)
+        self.successful_files.set(0)
+        self.failed_files.set(0)
+        self.update_file_stats()
+        self.log_text.delete(1.0, tk.END)
+        self.status.set(self.text("converting_audio"))
+        self.converting = True
+        self.convert_button.config(state="disabled")
+        self.start_ui_queue()
+
+        thread = threading.Thread(target=self.perform_conversion, args=(options,))
+        thread.daemon = True
+        thread.start()
+
+    def perform_conversion(self, options):
+        """Run the engine off the Tk thread, reporting back through the UI queue"""
+        try:
+            os.makedirs(options["output_folder"], exist_ok=True)
+            self.engine = AudioConversionEngine(
+                find_ffmpeg() or os.path.abspath("./bin/ffmpeg.exe"),
+                options,
+                messages=self.engine_messages(),
+                log=self.log_sink.write,
+                on_status=lambda status: self.call_in_ui(self.status.set, status),
+                on_total=lambda count: self.call_in_ui(self.set_total_files, count),
+                on_result=lambda success: self.call_in_ui(self.record_result, success)
+            )
+            self.progress = self.engine.progress
+            succeeded, failed = self.engine.run()
+            self.call_in_ui(self.finish_conversion, None, succeeded + failed)
+        except Exception as e:
+            self.call_in_ui(self.finish_conversion, e, 0)
+
+    def cancel_conversion(self):
+        """Cancel the running batch; running ffmpeg processes are stopped and queued files skipped"""
+        if self.converting and self.engine is not None:
+            self.engine.cancel()
+
+    def refresh_progress(self):
+        """Show the aggregate progress and ETA of the batch"""
+        fraction, eta, _ = self.progress.snapshot()
+        self.progress_value.set(fraction * 100)
+        self.progress_text.set(self.text("progress_overall").format(
+            fraction * 100, format_duration(eta) if eta is not None else "-"))
+
+    def set_total_files(self, count):
+        self.total_files.set(count)
+        self.update_file_stats()
+
+    def record_result(self, success):
+        """Count a converted or failed file"""
+        if success:
+            self.successful_files.set(self.successful_files.get() + 1)
+        else:
+            self.failed_files.set(self.failed_files.get() + 1)
+        self.update_file_stats()
+
+    def update_file_stats(self):
+        self.file_stats.set(f"Total: {self.total_files.get()} | "
+                            f"Success: {self.successful_files.get()} | "
+                            f"Failed: {self.failed_files.get()}")
+
+    def finish_conversion(self, error, total):
+        """Show the final status once the batch thread has finished (Tk thread only)"""
+        self.converting = False
+        self.convert_button.config(state="normal")
+        if error is not None:
+            self.status.set(f"{self.text('conversion_failed')}: {error}")
+        elif total:
+            self.status.set(self.text("conversion_complete"))
@@ -0,0 +1,336 @@
+"""Command-line entry point for running conversions without the GUI
+
+Examples:
+    python -m batch_convert video /media/in /media/out --format mp4 --workers auto --recursive
+    python -m batch_convert audio ./podcasts ./podcasts/opus --format opus --bitrate 64k --recursive
+    python -m batch_convert image ./photos ./photos/converted --input-format heic --format jpg
+    python -m batch_convert watch /ingest /ingest/mp4 --recursive --stable-seconds 30
+    python -m batch_convert profiles --save
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+import threading
+import audio_engine
+import image_engine
+import video_engine
+import watch_folder
+from encoding_ladder import parse_ladder
+from loudness import DEFAULT_TARGET, parse_target
+from crf_search import DEFAULT_QUALITY_TARGET, parse_quality_target
+from encoding_profiles import DEFAULT_PROFILE, PROFILES_FILE, load_profiles, profile_args, save_profiles
+from job_scheduler import ORDER_LONGEST_FIRST, ORDER_SHORTEST_FIRST, ORDER_DISCOVERY
+from thread_budget import MAX_AUTO_WORKERS
+from ffmpeg_runner import DEFAULT_STALL_TIMEOUT
+
+# Workers log concurrently; one lock keeps their lines from interleaving
+log_lock = threading.Lock()
+
+
+def log_line(message):
+    """Print one log line from any thread"""
+    with log_lock:
+        print(message, flush=True)
+
+
+def workers_arg(value):
+    """Parse --workers: a positive number or "auto" (returned as None)"""
+    if value == "auto":
+        return None
+    try:
+        workers = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("must be a positive integer or 'auto'")
+    if workers < 1:
+        raise argparse.ArgumentTypeError("must be a positive integer or 'auto'")
+    return workers
+
+
+def ladder_arg(value):
+    """Parse --ladder into a rendition list"""
+    try:
+        return parse_ladder(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def loudness_arg(value):
+    """Parse --loudnorm I:TP:LRA into a loudness target"""
+    try:
+        return parse_target(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def add_loudness_argument(parser):
+    parser.add_argument("--loudnorm", type=loudness_arg, nargs="?", const=DEFAULT_TARGET, default=None,
+                        metavar="I:TP:LRA",
+                        help="normalize loudness in two passes, by default to EBU R128 (-23:-1:7); give another "
+                             "target as --loudnorm=-16:-1.5:11. Measurements are cached so re-exports skip the analysis")
+
+
+def quality_arg(value):
+    """Parse --auto-crf METRIC:VALUE"""
+    try:
+        return parse_quality_target(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def add_adaptive_arguments(parser):
+    parser.add_argument("--adaptive", action="store_true",
+                        help="start with --workers jobs, then add or remove jobs during the batch from throughput, "
+                             "load, memory and I/O pressure")
+    parser.add_argument("--max-workers", type=int, default=None,
+                        help=f"upper bound for --adaptive (default: {MAX_AUTO_WORKERS})")
+
+
+def add_limit_arguments(parser):
+    parser.add_argument("--timeout", type=float, default=None, metavar="SECONDS",
+                        help="stop an ffmpeg run that takes longer than this (default: no limit)")
+    parser.add_argument("--stall-timeout", type=float, default=DEFAULT_STALL_TIMEOUT, metavar="SECONDS",
+                        help="stop an ffmpeg run whose output position has not advanced for this long; "
+                             f"0 disables (default: {DEFAULT_STALL_TIMEOUT})")
+
+
+def cancel_on_interrupt(engine):
+    """First Ctrl+C cancels the batch and stops running ffmpeg processes; a second one exits at once"""
+    def cancel(signum, frame):
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        engine.cancel()
+    signal.signal(signal.SIGINT, cancel)
+
+
+def add_video_arguments(video):
+    """Options shared by the video and watch commands"""
+    video.add_argument("input", help="input folder")
+    video.add_argument("output", help="output folder")
+    video.add_argument("--format", default="mp4", choices=video_engine.OUTPUT_FORMATS, help="target format")
+    video.add_argument("--workers", type=workers_arg, default=4, help="parallel jobs, or 'auto' (default: 4)")
+    video.add_argument("--overwrite", action="store_true", help="overwrite existing output files")
+    video.add_argument("--recursive", action="store_true", help="include subfolders")
+    video.add_argument("--order", default=ORDER_LONGEST_FIRST,
+                       choices=[ORDER_LONGEST_FIRST, ORDER_SHORTEST_FIRST, ORDER_DISCOVERY], help="job order")
+    video.add_argument("--segment-long", action="store_true", help="split long videos for parallel encoding")
+    video.add_argument("--segment-min-minutes", type=int, default=10,
+                       help="minimum length of videos that are split (default: 10)")
+    video.add_argument("--profile", default=DEFAULT_PROFILE, choices=sorted(load_profiles()),
+                       help=f"encoding profile for streams that need re-encoding (default: {DEFAULT_PROFILE})")
+    video.add_argument("--ladder", type=ladder_arg, default=[], metavar="HEIGHTS",
+                       help="encode renditions of these heights from one decode, e.g. 1080,720,480; "
+                            "each goes to a subfolder named after it")
+    add_loudness_argument(video)
+    add_adaptive_arguments(video)
+    add_limit_arguments(video)
+    video.add_argument("--auto-crf", type=quality_arg, nargs="?", const=DEFAULT_QUALITY_TARGET, default=None,
+                       metavar="METRIC:VALUE",
+                       help="pick each file's CRF from short sample encodes as the highest one reaching the quality "
+                            "target (default: ssim:0.98, or e.g. psnr:42); decisions are cached per source")
+    video.add_argument("--dedup", action="store_true",
+                       help="convert byte-identical files once and hard-link (or copy) the output for the others")
+    video.add_argument("--include", action="append", default=[], metavar="GLOB",
+                       help="only convert files whose path below the input folder matches (repeatable)")
+    video.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                       help="skip files and folders whose path below the input folder matches (repeatable)")
+    video.add_argument("--no-scan-snapshot", action="store_true",
+                       help="read every folder instead of reusing listings of unchanged ones")
+    video.add_argument("--ffmpeg", help="path to ffmpeg (default: bin directory, then PATH)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="batch_convert", description="Batch convert video or image files.")
+    subparsers = parser.add_subparsers(dest="kind")
+    # Set as an attribute; the add_subparsers() keyword needs Python 3.7
+    subparsers.required = True
+
+    add_video_arguments(subparsers.add_parser("video", help="convert video files with FFmpeg"))
+
+    watch = subparsers.add_parser("watch", help="convert video files as they arrive in a folder (Ctrl+C stops)")
+    add_video_arguments(watch)
+    watch.add_argument("--stable-seconds", type=float, default=watch_folder.DEFAULT_STABLE_SECONDS,
+                       help="how long a file's size must stay unchanged before it is converted "
+                            f"(default: {watch_folder.DEFAULT_STABLE_SECONDS})")
+    watch.add_argument("--poll-interval", type=float, default=watch_folder.DEFAULT_POLL_INTERVAL,
+                       help=f"seconds between checks (default: {watch_folder.DEFAULT_POLL_INTERVAL})")
+
+    profiles = subparsers.add_parser("profiles", help="list encoding profiles")
+    profiles.add_argument("--format", default="mp4", choices=video_engine.OUTPUT_FORMATS,
+                          help="show the arguments used for this target format (default: mp4)")
+    profiles.add_argument("--save", action="store_true",
+                          help=f"write all profiles to {PROFILES_FILE} for editing")
+
+    audio = subparsers.add_parser("audio", help="convert audio files, or extract audio from videos, with FFmpeg")
+    audio.add_argument("input", help="input folder")
+    audio.add_argument("output", help="output folder")
+    audio.add_argument("--format", default="mp3", choices=audio_engine.OUTPUT_FORMATS, help="target format")
+    audio.add_argument("--bitrate", default="", help="bitrate for mp3, aac and opus, e.g. 192k (default: per format)")
+    audio.add_argument("--from-video", action="store_true", help="also extract the audio track of video files")
+    audio.add_argument("--workers", type=workers_arg, default=None,
+                       help="parallel jobs, or 'auto' (default: one per core)")
+    audio.add_argument("--overwrite", action="store_true", help="overwrite existing output files")
+    audio.add_argument("--recursive", action="store_true", help="include subfolders")
+    add_loudness_argument(audio)
+    add_adaptive_arguments(audio)
+    add_limit_arguments(audio)
+    audio.add_argument("--dedup", action="store_true",
+                       help="convert byte-identical files once and hard-link (or copy) the output for the others")
+    audio.add_argument("--include", action="append", default=[], metavar="GLOB",
+                       help="only convert files whose path below the input folder matches (repeatable)")
+    audio.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                       help="skip files and folders whose path below the input folder matches (repeatable)")
+    audio.add_argument("--ffmpeg", help="path to ffmpeg (default: bin directory, then PATH)")
+
+    image = subparsers.add_parser("image", help="convert images with ImageMagick")
+    image.add_argument("input", help="input folder")
+    image.add_argument("output", help="output folder")
+    image.add_argument("--input-format", default="heic", choices=image_engine.INPUT_FORMATS, help="input format")
+    image.add_argument("--format", default="jpg", choices=image_engine.OUTPUT_FORMATS, help="target format")
+    image.add_argument("--quality", type=int, default=80, help="JPEG quality (default: 80)")
+    image.add_argument("--recursive", action="store_true", help="include subfolders")
+    image.add_argument("--workers", type=workers_arg, default=None,
+                       help="parallel ImageMagick processes, or 'auto' (default: one per core)")
+    image.add_argument("--backend", default=image_engine.BACKEND_AUTO, choices=image_engine.BACKENDS,
+                       help="Pillow, ImageMagick, or Pillow where it can handle the formats (default: auto)")
+    image.add_argument("--batch-size", type=int, default=1,
+                       help=f"files per ImageMagick process; try {image_engine.DEFAULT_BATCH_SIZE} for small images "
+                            "(default: 1)")
+    return parser
+
+
+def video_engine_for(args):
+    ffmpeg_path = args.ffmpeg or video_engine.find_ffmpeg()
+    if not ffmpeg_path:
+        raise FileNotFoundError("FFmpeg not found; use --ffmpeg or put it on PATH")
+
+    options = video_engine.default_options()
+    options.update({
+        "input_folder": args.input,
+        "output_folder": args.output,
+        "target_format": args.format,
+        "include_subfolders": args.recursive,
+        "overwrite_existing": args.overwrite,
+        "thread_count": args.workers or 1,
+        "auto_threads": args.workers is None,
+        "adaptive_workers": args.adaptive,
+        "max_workers": args.max_workers,
+        "job_timeout": args.timeout,
+        "stall_timeout": args.stall_timeout or None,
+        "job_order": args.order,
+        "segment_long_videos": args.segment_long,
+        "segment_min_seconds": args.segment_min_minutes * 60,
+        "include_patterns": args.include,
+        "exclude_patterns": args.exclude,
+        "scan_snapshot": not args.no_scan_snapshot,
+        "renditions": args.ladder,
+        "profile": args.profile,
+        "deduplicate": args.dedup,
+        "loudness_target": args.loudnorm,
+        "quality_target": args.auto_crf,
+    })
+    os.makedirs(args.output, exist_ok=True)
+    return video_engine.VideoConversionEngine(ffmpeg_path, options, log=log_line)
+
+
+def run_video(args):
+    engine = video_engine_for(args)
+    cancel_on_interrupt(engine)
+    return engine.run()
+
+
+def run_watch(args):
+    engine = video_engine_for(args)
+    stop_event = threading.Event()
+
+    # Ctrl+C stops watching while files already queued are still converted; a second one cancels those
+    def stop_watching(signum, frame):
+        stop_event.set()
+        cancel_on_interrupt(engine)
+    signal.signal(signal.SIGINT, stop_watching)
+    return engine.watch(stop_event, args.stable_seconds, args.poll_interval)
+
+
+def run_audio(args):
+    ffmpeg_path = args.ffmpeg or video_engine.find_ffmpeg()
+    if not ffmpeg_path:
+        raise FileNotFoundError("FFmpeg not found; use --ffmpeg or put it on PATH")
+
+    options = audio_engine.default_options()
+    options.update({
+        "input_folder": args.input,
+        "output_folder": args.output,
+        "target_format": args.format,
+        "audio_bitrate": args.bitrate,
+        "include_video_files": args.from_video,
+        "include_subfolders": args.recursive,
+        "overwrite_existing": args.overwrite,
+        "thread_count": args.workers or 1,
+        "auto_threads": args.workers is None,
+        "adaptive_workers": args.adaptive,
+        "max_workers": args.max_workers,
+        "job_timeout": args.timeout,
+        "stall_timeout": args.stall_timeout or None,
+        "include_patterns": args.include,
+        "exclude_patterns": args.exclude,
+        "deduplicate": args.dedup,
+        "loudness_target": args.loudnorm,
+    })
+    os.makedirs(args.output, exist_ok=True)
+    engine = audio_engine.AudioConversionEngine(ffmpeg_path, options, log=log_line)
+    cancel_on_interrupt(engine)
+    return engine.run()
+
+
+def run_image(args):
+    return image_engine.convert_images(
+        args.input,
+        args.output,
+        args.input_format,
+        args.format,
+        quality=args.quality,
+        recursive=args.recursive,
+        workers=args.workers,
+        batch_size=max(1, args.batch_size),
+        backend=args.backend,
+        log=log_line
+    )
+
+
+def list_profiles(args):
+    profiles = load_profiles()
+    for name, profile in sorted(profiles.items()):
+        video_args, audio_args = profile_args(profile, args.format)
+        print(f"{name}: {' '.join(video_args + audio_args)}")
+    if args.save:
+        save_profiles(profiles)
+        print(f"Saved {len(profiles)} profiles to {PROFILES_FILE}")
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.kind == "profiles":
+        return list_profiles(args)
+    if not os.path.isdir(args.input):
+        print(f"Input folder does not exist: {args.input}", file=sys.stderr)
+        return 2
+    start_time = time.monotonic()
+    try:
+        if args.kind == "video":
+            succeeded, failed = run_video(args)
+        elif args.kind == "watch":
+            succeeded, failed = run_watch(args)
+        elif args.kind == "audio":
+            succeeded, failed = run_audio(args)
+        else:
+            succeeded, failed = run_image(args)
+    except (FileNotFoundError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    print(f"Done: {succeeded} succeeded, {failed} failed in {time.monotonic() - start_time:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import threading
+
+# Seconds between two adjustments of the worker limit
+SAMPLE_INTERVAL = 5.0
+
+# Share of time ("some" avg10, in percent) tasks stalled on memory or I/O above which workers are taken away
+MEMORY_PRESSURE_LIMIT = 10.0
+IO_PRESSURE_LIMIT = 40.0
+
+# Below this share of available RAM a worker is taken away, whatever the pressure reports
+MIN_FREE_MEMORY = 0.10
+
+# Workers are only added while the 1-minute load per core stays below this
+LOAD_PER_CORE_LIMIT = 0.9
+
+# A throughput change smaller than this share counts as no change
+THROUGHPUT_TOLERANCE = 0.05
+
+# Samples after which a limit that did not pay off may be tried again
+RETRY_SAMPLES = 12
+
+
+def read_loadavg(path="/proc/loadavg"):
+    """1-minute load average, or None where /proc is not available"""
+    try:
+        with open(path) as f:
+            return float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def read_pressure(resource):
+    """"some" avg10 of a pressure stall file (cpu, memory or io), or None without PSI support"""
+    try:
+        with open(f"/proc/pressure/{resource}") as f:
+            for line in f:
+                fields = line.split()
+                if fields and fields[0] == "some":
+                    return float(dict(field.split("=") for field in fields[1:])["avg10"])
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def read_free_memory(path="/proc/meminfo"):
+    """Share of RAM that is available to new processes, or None where /proc is not available"""
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                values[key] = int(rest.split()[0])
+        return values["MemAvailable"] / values["MemTotal"]
+    except (OSError, ValueError, IndexError, KeyError, ZeroDivisionError):
+        return None
+
+
+def sample_system():
+    """Current load, memory and I/O pressure and free memory; unknown values are None"""
+    return {
+        "load": read_loadavg(),
+        "memory_pressure": read_pressure("memory"),
+        "io_pressure": read_pressure("io"),
+        "free_memory": read_free_memory(),
+    }
+
+
+class ConcurrencyController:
+    """Limit on the number of workers running at once, adjusted during a batch
+
+    Workers enter the controller (it is a context manager) around each task,
+    so the pool may hold more threads than are allowed to run. update() is
+    called periodically with the work done so far and moves the limit by one
+    step at a time: down under memory or I/O pressure, up while the cores have
+    headroom and tasks are waiting, and back down when the last step up did
+    not raise the throughput. With min_workers == max_workers it is a fixed
+    limit.
+    """
+
+    def __init__(self, workers, min_workers=1, max_workers=None, cores=1, sampler=sample_system):
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers or workers)
+        self.limit = min(max(workers, self.min_workers), self.max_workers)
+        self.cores = cores
+        self.sampler = sampler
+        self.active = 0
+        self._cond = threading.Condition()
+        self._last_sample = None
+        self._last_rate = None
+        self._last_step = 0
+        self._ceiling = None
+        self._ceiling_age = 0
+
+    @property
+    def adaptive(self):
+        return self.min_workers < self.max_workers
+
+    def __enter__(self):
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+        return False
+
+    def set_limit(self, limit):
+        with self._cond:
+            self.limit = min(max(limit, self.min_workers), self.max_workers)
+            self._cond.notify_all()
+
+    def update(self, work_done, elapsed, backlog):
+        """Take a sample and adjust the limit
+
+        work_done is the total work finished so far (in any unit that stays
+        the same over the batch), elapsed the seconds since the previous
+        call and backlog the number of tasks waiting for a worker. Returns
+        (new limit, reason) when the limit changed, else None.
+        """
+        rate = (work_done - self._last_sample) / elapsed if self._last_sample is not None and elapsed > 0 else None
+        self._last_sample = work_done
+        if self._ceiling is not None:
+            self._ceiling_age += 1
+            if self._ceiling_age >= RETRY_SAMPLES:
+                self._ceiling = None
+
+        system = self.sampler()
+        step, reason = 0, None
+        if (system["memory_pressure"] is not None and system["memory_pressure"] > MEMORY_PRESSURE_LIMIT) or (
+                system["free_memory"] is not None and system["free_memory"] < MIN_FREE_MEMORY):
+            step, reason = -1, "memory"
+        elif system["io_pressure"] is not None and system["io_pressure"] > IO_PRESSURE_LIMIT:
+            step, reason = -1, "io"
+        elif (self._last_step > 0 and rate is not None and self._last_rate is not None
+              and rate < self._last_rate * (1 + THROUGHPUT_TOLERANCE)):
+            # The extra worker did not pay off; go back and stay below this limit for a while
+            step, reason = -1, "throughput"
+            self._ceiling, self._ceiling_age = self.limit, 0
+        elif backlog > 0 and self.active >= self.limit and (self._ceiling is None or self.limit + 1 < self._ceiling) and (
+                system["load"] is None or system["load"] / self.cores < LOAD_PER_CORE_LIMIT):
+            step, reason = 1, "headroom"
+
+        self._last_rate = rate
+        old_limit = self.limit
+        self.set_limit(old_limit + step)
+        self._last_step = self.limit - old_limit
+        if self._last_step:
+            return self.limit, reason
+        return None
@@ -0,0 +1,108 @@
+import os
+import shutil
+import hashlib
+from job_journal import partial_path, commit_output
+
+# Bytes hashed at the start and at the end of a file for the quick comparison
+HEAD_TAIL_BYTES = 1 << 20
+
+READ_CHUNK_BYTES = 1 << 20
+
+
+def _partial_hash(path, size, block_size):
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        digest.update(f.read(block_size))
+        if size > block_size:
+            f.seek(max(block_size, size - block_size))
+            digest.update(f.read(block_size))
+    return digest.digest()
+
+
+def _full_hash(path):
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+class DuplicateFinder:
+    """Recognize files whose content is identical to one added earlier
+
+    Files are compared by size first. Only files of equal size are hashed,
+    first over their head and tail blocks and, if those match too, over
+    their whole content, so unique files are normally never read in full.
+    """
+
+    def __init__(self, block_size=HEAD_TAIL_BYTES):
+        self.block_size = block_size
+        self._by_size = {}
+        self._partial = {}
+        self._full = {}
+
+    def _hash(self, cache, path, compute):
+        if path not in cache:
+            cache[path] = compute()
+        return cache[path]
+
+    def add(self, path):
+        """Return the earlier file identical to path, or None if path is unique so far"""
+        try:
+            size = os.path.getsize(path)
+            candidates = self._by_size.setdefault(size, [])
+            for candidate in candidates:
+                if (self._hash(self._partial, candidate, lambda: _partial_hash(candidate, size, self.block_size)) !=
+                        self._hash(self._partial, path, lambda: _partial_hash(path, size, self.block_size))):
+                    continue
+                # Head and tail blocks already cover the whole of a small file
+                if size <= 2 * self.block_size or (self._hash(self._full, candidate, lambda: _full_hash(candidate)) ==
+                                                   self._hash(self._full, path, lambda: _full_hash(path))):
+                    return candidate
+        except OSError:
+            # An unreadable file is left to the conversion, which reports the error
+            return None
+        candidates.append(path)
+        return None
+
+    def forget(self, path):
+        """Drop a file and its cached hashes, e.g. because it changed since it was added"""
+        for candidates in self._by_size.values():
+            if path in candidates:
+                candidates.remove(path)
+        self._partial.pop(path, None)
+        self._full.pop(path, None)
+
+
+def same_file_contents(first, second):
+    """True if second is a link to first or a copy that kept its size and mtime"""
+    try:
+        first_stat = os.stat(first)
+        second_stat = os.stat(second)
+    except OSError:
+        return False
+    if os.path.samestat(first_stat, second_stat):
+        return True
+    return first_stat.st_size == second_stat.st_size and first_stat.st_mtime_ns == second_stat.st_mtime_ns
+
+
+def link_or_copy(source, target):
+    """Give target the content of source as a hard link, or a copy where links are not possible
+
+    The link or copy is made under the temporary output name and renamed
+    into place. Returns True if a hard link was made.
+    """
+    temp_file = partial_path(target)
+    try:
+        os.remove(temp_file)
+    except OSError:
+        pass
+    try:
+        os.link(source, temp_file)
+        linked = True
+    except OSError:
+        # Other volumes and file systems without hard links get a copy
+        shutil.copy2(source, temp_file)
+        linked = False
+    commit_output(temp_file, target)
+    return linked
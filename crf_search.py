@@ -0,0 +1,126 @@
+import os
+import re
+import tempfile
+from ffmpeg_runner import run_ffmpeg_quiet
+
+# Quality every sampled excerpt has to reach; SSIM is the "All" value (0-1), PSNR the average in dB
+QUALITY_METRICS = ("ssim", "psnr")
+DEFAULT_QUALITY_TARGET = {"metric": "ssim", "value": 0.98}
+
+# Excerpts spread over the file and their length in seconds
+SAMPLE_COUNT = 3
+SAMPLE_SECONDS = 4.0
+
+# CRF values tried, relative to the profile's CRF
+CRF_SEARCH_RANGE = (-6, 10)
+MIN_CRF = 0
+MAX_CRF = 51
+
+SCORE_PATTERNS = {
+    "ssim": re.compile(r"All:([\d.]+)"),
+    "psnr": re.compile(r"average:([\d.]+|inf)"),
+}
+
+
+def parse_quality_target(text):
+    """Parse "METRIC:VALUE" such as "ssim:0.98" or "psnr:42" into a target dict
+
+    Raises ValueError for unknown metrics or out of range values.
+    """
+    metric, _, value = text.partition(":")
+    metric = metric.strip().lower()
+    if metric not in QUALITY_METRICS:
+        raise ValueError(f"Quality metric must be one of {', '.join(QUALITY_METRICS)}, got {text}")
+    try:
+        value = float(value)
+    except ValueError:
+        raise ValueError(f"Quality target must be METRIC:VALUE, e.g. ssim:0.98, got {text}")
+    if not (0 < value < 1 if metric == "ssim" else 20 <= value <= 100):
+        raise ValueError(f"Quality target out of range: {text}")
+    return {"metric": metric, "value": value}
+
+
+def with_crf(video_args, crf):
+    """Copy of video_args with the value after -crf replaced"""
+    args = list(video_args)
+    args[args.index('-crf') + 1] = str(crf)
+    return args
+
+
+def cache_kind(target, video_args):
+    """Probe cache kind for a decision; it depends on the target and every encoder setting but the CRF"""
+    return f"crf:{target['metric']}:{target['value']:g}:{' '.join(with_crf(video_args, '*'))}"
+
+
+def sample_windows(duration, count=SAMPLE_COUNT, seconds=SAMPLE_SECONDS):
+    """(start, length) of excerpts spread evenly over a file; short files are sampled whole"""
+    if duration <= count * seconds:
+        return [(0.0, duration)]
+    return [(duration * (index + 1) / (count + 1) - seconds / 2, seconds) for index in range(count)]
+
+
+def encode_sample(ffmpeg_path, source, window, video_args, sample_file, thread_args=(), control=None):
+    """Encode the video of one excerpt with the given encoder arguments"""
+    start, length = window
+    args = list(video_args)
+    # Container tags such as hvc1 only matter for the final output
+    if '-tag:v' in args:
+        index = args.index('-tag:v')
+        del args[index:index + 2]
+    run_ffmpeg_quiet([ffmpeg_path, '-hide_banner', '-nostdin', '-nostats', '-y',
+                      '-ss', f"{start:.3f}", '-t', f"{length:.3f}", '-i', source,
+                      '-map', '0:v:0', '-an', '-sn', '-dn'] + args + list(thread_args) + ['-f', 'matroska', sample_file],
+                     control)
+
+
+def measure_quality(ffmpeg_path, source, window, sample_file, metric, control=None):
+    """SSIM or PSNR of an encoded excerpt against the same excerpt of the source"""
+    start, length = window
+    stderr = run_ffmpeg_quiet([ffmpeg_path, '-hide_banner', '-nostdin', '-nostats',
+                               '-i', sample_file, '-ss', f"{start:.3f}", '-t', f"{length:.3f}", '-i', source,
+                               '-lavfi', f"[0:v][1:v]{metric}", '-f', 'null', '-'], control)
+    matches = SCORE_PATTERNS[metric].findall(stderr)
+    if not matches:
+        raise ValueError(f"ffmpeg printed no {metric.upper()} for {source}")
+    return float(matches[-1])
+
+
+def search_crf(ffmpeg_path, source, duration, video_args, target, thread_args=(), control=None):
+    """Highest CRF whose sampled excerpts all reach the quality target
+
+    Quality falls as the CRF rises, so the range around the profile's CRF
+    is bisected. If no CRF in the range reaches the target, the lowest one
+    is used. Returns {"crf", "score", "tried"} with the number of CRFs encoded.
+    """
+    base = int(float(video_args[video_args.index('-crf') + 1]))
+    low = max(MIN_CRF, base + CRF_SEARCH_RANGE[0])
+    high = min(MAX_CRF, base + CRF_SEARCH_RANGE[1])
+    windows = sample_windows(duration)
+    scores = {}
+    with tempfile.TemporaryDirectory(prefix="crf_search_") as temp_dir:
+        def score(crf):
+            args = with_crf(video_args, crf)
+            worst = None
+            for index, window in enumerate(windows):
+                sample_file = os.path.join(temp_dir, f"{crf}_{index}.mkv")
+                encode_sample(ffmpeg_path, source, window, args, sample_file, thread_args, control)
+                value = measure_quality(ffmpeg_path, source, window, sample_file, target["metric"], control)
+                worst = value if worst is None else min(worst, value)
+                # One excerpt below the target already rules this CRF out
+                if worst < target["value"]:
+                    break
+            return worst
+
+        lowest = low
+        best = None
+        while low <= high:
+            crf = (low + high) // 2
+            scores[crf] = score(crf)
+            if scores[crf] >= target["value"]:
+                best = crf
+                low = crf + 1
+            else:
+                high = crf - 1
+    if best is None:
+        best = lowest
+    return {"crf": best, "score": scores[best], "tried": len(scores)}
@@ -0,0 +1,51 @@
+import os
+
+
+def parse_ladder(text):
+    """Parse a rendition list like "1080,720,480" into [{"name": "1080p", "height": 1080}, ...]
+
+    Raises ValueError for anything but positive even heights.
+    """
+    renditions = []
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        height = int(part.lower().rstrip("p"))
+        if height <= 0 or height % 2:
+            raise ValueError(f"Invalid rendition height: {part}")
+        if all(rendition["height"] != height for rendition in renditions):
+            renditions.append({"name": f"{height}p", "height": height})
+    return renditions
+
+
+def rendition_path(output_folder, output_file, rendition):
+    """Output of one rendition: the planned output mirrored below a folder named after it"""
+    return os.path.join(output_folder, rendition["name"], os.path.relpath(output_file, output_folder))
+
+
+def ladder_video_args(video_args, transcode_video_args):
+    """Video codec arguments for scaled renditions, which can never be stream copies"""
+    if len(video_args) > 1 and video_args[1] == 'copy':
+        return list(transcode_video_args)
+    return list(video_args)
+
+
+def build_ladder_command(ffmpeg_path, video_file, outputs, video_args, audio_args, thread_args=([], [])):
+    """One ffmpeg command that decodes the source once and encodes every rendition
+
+    outputs is a list of (output file, rendition) and video_args the
+    encoder arguments from ladder_video_args(). The decoded video is
+    split into one branch per rendition and scaled to its height, keeping
+    the aspect ratio and never upscaling; the audio is encoded per output.
+    """
+    decoder_threads, encoder_threads = thread_args
+    branches = [f"[v{index}]" for index in range(len(outputs))]
+    filters = [f"[0:v:0]split={len(outputs)}{''.join(branches)}"]
+    for index, (_, rendition) in enumerate(outputs):
+        filters.append(f"[v{index}]scale=-2:'min({rendition['height']},trunc(ih/2)*2)'[out{index}]")
+
+    command = [ffmpeg_path, '-y'] + decoder_threads + ['-i', video_file, '-filter_complex', ";".join(filters)]
+    for index, (output_file, _) in enumerate(outputs):
+        command += (['-map', f"[out{index}]", '-map', '0:a:0?'] + list(video_args) +
+                    encoder_threads + audio_args + [output_file])
+    return command
@@ -0,0 +1,129 @@
+import os
+import json
+from media_probe import CONTAINER_CODECS
+
+# User profiles live next to config.json and extend or override the built-in ones
+PROFILES_FILE = "profiles.json"
+
+DEFAULT_PROFILE = "balanced"
+
+# Settings of a profile; None leaves the option out of the ffmpeg command
+PROFILE_KEYS = ["video_codec", "preset", "crf", "video_bitrate", "audio_codec", "audio_bitrate"]
+
+BUILTIN_PROFILES = {
+    "balanced": {"video_codec": "libx264", "preset": "medium", "crf": 23,
+                 "audio_codec": "aac", "audio_bitrate": "128k"},
+    "quality": {"video_codec": "libx264", "preset": "slow", "crf": 18,
+                "audio_codec": "aac", "audio_bitrate": "192k"},
+    "fast": {"video_codec": "libx264", "preset": "veryfast", "crf": 23,
+             "audio_codec": "aac", "audio_bitrate": "128k"},
+    "ultrafast": {"video_codec": "libx264", "preset": "ultrafast", "crf": 26,
+                  "audio_codec": "aac", "audio_bitrate": "128k"},
+    "small_hevc": {"video_codec": "libx265", "preset": "medium", "crf": 28,
+                   "audio_codec": "aac", "audio_bitrate": "96k"},
+}
+
+# Codec name (as reported by ffprobe) produced by each encoder
+ENCODER_CODECS = {
+    "libx264": "h264",
+    "libx265": "hevc",
+    "libvpx-vp9": "vp9",
+    "libsvtav1": "av1",
+    "libaom-av1": "av1",
+    "mpeg4": "mpeg4",
+    "wmv2": "wmv2",
+    "flv": "flv1",
+    "aac": "aac",
+    "libmp3lame": "mp3",
+    "libopus": "opus",
+    "ac3": "ac3",
+    "wmav2": "wmav2",
+}
+
+# Used for a stream whose profile codec the target container cannot hold
+CONTAINER_DEFAULTS = {
+    "wmv": {
+        "video": {"video_codec": "wmv2", "preset": None, "crf": None, "video_bitrate": "2M"},
+        "audio": {"audio_codec": "wmav2", "audio_bitrate": "128k"},
+    },
+    "avi": {
+        "video": {"video_codec": "libx264", "preset": "medium", "crf": 23, "video_bitrate": None},
+        "audio": {"audio_codec": "libmp3lame", "audio_bitrate": "192k"},
+    },
+    "flv": {
+        "video": {"video_codec": "libx264", "preset": "medium", "crf": 23, "video_bitrate": None},
+        "audio": {"audio_codec": "aac", "audio_bitrate": "128k"},
+    },
+}
+
+
+def _valid_profile(profile):
+    # Profiles and their per-format overrides must be JSON objects
+    if not isinstance(profile, dict):
+        return False
+    formats = profile.get("formats", {})
+    return isinstance(formats, dict) and all(isinstance(overrides, dict) for overrides in formats.values())
+
+
+def load_profiles(path=PROFILES_FILE):
+    """Built-in profiles updated with the ones saved in the profiles file"""
+    profiles = {name: dict(profile) for name, profile in BUILTIN_PROFILES.items()}
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for name, profile in json.load(f).items():
+                    if not _valid_profile(profile):
+                        # A malformed entry is left out instead of failing every other profile
+                        print(f"Error loading profile {name!r} from {path}: expected an object, got {profile!r}")
+                        continue
+                    profiles[name] = dict(profiles.get(name, BUILTIN_PROFILES[DEFAULT_PROFILE]), **profile)
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Error loading profiles from {path}: {e}")
+    return profiles
+
+
+def save_profiles(profiles, path=PROFILES_FILE):
+    """Write profiles to the profiles file"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(profiles, f, indent=4)
+
+
+def _fits(encoder, allowed):
+    codec = ENCODER_CODECS.get(encoder)
+    return allowed is None or codec is None or codec in allowed
+
+
+def resolve_profile(profile, target_format):
+    """Settings to use for a container: per-format overrides, then container defaults for unfit codecs"""
+    target_format = target_format.lower()
+    settings = {key: profile.get(key) for key in PROFILE_KEYS}
+    settings.update(profile.get("formats", {}).get(target_format, {}))
+
+    container = CONTAINER_CODECS.get(target_format)
+    defaults = CONTAINER_DEFAULTS.get(target_format)
+    if container and defaults:
+        if not _fits(settings["video_codec"], container["video"]):
+            settings.update(defaults["video"])
+        if not _fits(settings["audio_codec"], container["audio"]):
+            settings.update(defaults["audio"])
+    return settings
+
+
+def profile_args(profile, target_format):
+    """(video_args, audio_args) ffmpeg uses to re-encode streams with a profile"""
+    settings = resolve_profile(profile, target_format)
+    video_args = ['-c:v', settings["video_codec"]]
+    if settings["preset"]:
+        video_args += ['-preset', settings["preset"]]
+    if settings["crf"] is not None:
+        video_args += ['-crf', str(settings["crf"])]
+    elif settings["video_bitrate"]:
+        video_args += ['-b:v', settings["video_bitrate"]]
+    # Players on Apple platforms only accept HEVC in MP4/MOV with the hvc1 tag
+    if ENCODER_CODECS.get(settings["video_codec"]) == "hevc" and target_format.lower() in ("mp4", "mov"):
+        video_args += ['-tag:v', 'hvc1']
+
+    audio_args = ['-c:a', settings["audio_codec"]]
+    if settings["audio_bitrate"]:
+        audio_args += ['-b:a', settings["audio_bitrate"]]
+    return video_args, audio_args
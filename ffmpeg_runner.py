@@ -0,0 +1,262 @@
+import os
+import time
+import atexit
+import signal
+import subprocess
+import threading
+from collections import deque
+
+# Only the tail of ffmpeg's stderr is kept for error messages
+STDERR_TAIL_LINES = 20
+
+# Seconds without the output position advancing after which a job counts as stalled
+DEFAULT_STALL_TIMEOUT = 300
+
+# Seconds between checks of a running ffmpeg for cancellation and time limits
+WATCH_INTERVAL = 0.5
+
+# Seconds ffmpeg gets to exit after SIGTERM before its process group is killed
+TERMINATE_GRACE = 5.0
+
+
+class FFmpegError(subprocess.CalledProcessError):
+    """ffmpeg exited with an error; the message includes the end of its stderr"""
+
+    def __str__(self):
+        message = super().__str__()
+        # A killed ffmpeg may exit without printing anything
+        lines = self.stderr.strip().splitlines() if self.stderr else []
+        if lines:
+            message += " " + lines[-1]
+        return message
+
+
+class FFmpegCancelled(subprocess.SubprocessError):
+    """ffmpeg was stopped, or never started, because its batch was cancelled"""
+
+    def __str__(self):
+        return "cancelled"
+
+
+class FFmpegTimeout(subprocess.TimeoutExpired):
+    """ffmpeg was stopped for running too long or for making no progress"""
+
+    def __init__(self, cmd, timeout, stalled=False):
+        super().__init__(cmd, timeout)
+        self.stalled = stalled
+
+    def __str__(self):
+        if self.stalled:
+            return f"no progress for {self.timeout:g} seconds"
+        return f"timed out after {self.timeout:g} seconds"
+
+
+class JobControl:
+    """Cancellation and time limits for the ffmpeg processes of a batch
+
+    timeout limits the wall-clock time of one ffmpeg run and stall_timeout
+    the time its output position may stand still; None disables either.
+    cancel() stops every process running under this control and makes
+    later runs fail right away.
+    """
+
+    def __init__(self, timeout=None, stall_timeout=None):
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def wait(self, seconds):
+        """Sleep up to seconds; returns True once cancelled"""
+        return self._cancelled.wait(seconds)
+
+
+# Every ffmpeg started here, so none is left running when the program exits
+_running = set()
+_running_lock = threading.Lock()
+
+
+def _start(command, **kwargs):
+    """Start ffmpeg in its own process group so that it and its children can be stopped together"""
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    process = subprocess.Popen(command, stdin=subprocess.DEVNULL, encoding='utf-8', errors='replace', **kwargs)
+    with _running_lock:
+        _running.add(process)
+    return process
+
+
+def _stop(process):
+    """Terminate process if it is still running and forget it"""
+    if process.poll() is None:
+        terminate_process(process)
+    with _running_lock:
+        _running.discard(process)
+
+
+def terminate_process(process, grace=TERMINATE_GRACE):
+    """Stop a process started by _start together with everything it started
+
+    The process group gets SIGTERM, so ffmpeg can close its outputs, and
+    SIGKILL after grace seconds. On Windows the tree is killed with taskkill.
+    """
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        process.wait()
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    try:
+        process.wait(grace)
+    except subprocess.TimeoutExpired:
+        pass
+    # Children that outlived ffmpeg are still in its group
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+@atexit.register
+def terminate_all():
+    """Stop every ffmpeg still running, e.g. when the window is closed mid-batch"""
+    with _running_lock:
+        processes = list(_running)
+    for process in processes:
+        if process.poll() is None:
+            terminate_process(process, grace=1.0)
+
+
+def _watch(process, command, control, state):
+    """Stop process when its batch is cancelled or a time limit is exceeded; runs in its own thread
+
+    state["progress_at"] is the monotonic time the output position last
+    advanced, or None for runs without progress output; the reason for
+    stopping is stored in state["error"].
+    """
+    started = time.monotonic()
+    while True:
+        cancelled = control.wait(WATCH_INTERVAL)
+        if process.poll() is not None:
+            return
+        now = time.monotonic()
+        if cancelled:
+            state["error"] = FFmpegCancelled()
+        elif control.timeout and now - started > control.timeout:
+            state["error"] = FFmpegTimeout(command, control.timeout)
+        elif (control.stall_timeout and state["progress_at"] is not None
+              and now - state["progress_at"] > control.stall_timeout):
+            state["error"] = FFmpegTimeout(command, control.stall_timeout, stalled=True)
+        else:
+            continue
+        terminate_process(process)
+        return
+
+
+def _watched(process, command, control, progress=True):
+    """Start the watchdog of a process; returns the state it shares with the caller"""
+    state = {"progress_at": time.monotonic() if progress else None, "error": None}
+    if control is not None:
+        threading.Thread(target=_watch, args=(process, command, control, state), daemon=True).start()
+    return state
+
+
+def _parse_time(value):
+    try:
+        return int(value) / 1000000
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_float(value):
+    # Speed is reported as e.g. "1.5x"; both fps and speed may be "N/A"
+    try:
+        return float(value.rstrip("x"))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _drain(stream, tail):
+    for line in stream:
+        tail.append(line)
+
+
+def run_ffmpeg(command, on_progress=None, control=None):
+    """Run an ffmpeg command, streaming its -progress output instead of buffering it
+
+    command is a regular ffmpeg argument list starting with the executable.
+    on_progress, if given, is called with (out_time_seconds, fps, speed) for
+    every progress block ffmpeg emits. stderr is consumed concurrently and
+    only its last lines are kept, so memory stays flat on long encodes.
+    control is an optional JobControl that can stop the run.
+    Raises FFmpegError when ffmpeg exits with a non-zero status, and
+    FFmpegCancelled or FFmpegTimeout when control stopped it.
+    """
+    command = [command[0], '-nostdin', '-nostats', '-progress', 'pipe:1'] + list(command[1:])
+    if control is not None and control.cancelled:
+        raise FFmpegCancelled()
+    process = _start(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        state = _watched(process, command, control)
+        tail = deque(maxlen=STDERR_TAIL_LINES)
+        stderr_reader = threading.Thread(target=_drain, args=(process.stderr, tail), daemon=True)
+        stderr_reader.start()
+
+        block = {}
+        position = None
+        for line in process.stdout:
+            key, sep, value = line.strip().partition('=')
+            if not sep:
+                continue
+            block[key] = value
+            # Every progress block ends with progress=continue or progress=end
+            if key == 'progress':
+                seconds = _parse_time(block.get('out_time_us'))
+                if seconds is not None and (position is None or seconds > position):
+                    position = seconds
+                    state["progress_at"] = time.monotonic()
+                if on_progress is not None:
+                    on_progress(seconds, _parse_float(block.get('fps')), _parse_float(block.get('speed')))
+                block = {}
+
+        returncode = process.wait()
+        stderr_reader.join()
+    finally:
+        _stop(process)
+    if state["error"] is not None:
+        raise state["error"]
+    if returncode != 0:
+        raise FFmpegError(returncode, command, stderr=''.join(tail))
+
+
+def run_ffmpeg_quiet(command, control=None):
+    """Run an ffmpeg command without progress output and return its stderr
+
+    For analysis passes whose results ffmpeg prints to stderr. Raises the
+    same errors as run_ffmpeg; without progress there is no stall check.
+    """
+    if control is not None and control.cancelled:
+        raise FFmpegCancelled()
+    process = _start(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        state = _watched(process, command, control, progress=False)
+        _, stderr = process.communicate()
+    finally:
+        _stop(process)
+    if state["error"] is not None:
+        raise state["error"]
+    if process.returncode != 0:
+        raise FFmpegError(process.returncode, command, stderr=stderr)
+    return stderr
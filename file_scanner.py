@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import sqlite3
+import fnmatch
+import threading
+
+# Snapshot database lives next to config.json
+SCAN_SNAPSHOT_FILE = "scan_snapshot.db"
+
+# A listing taken this soon after the directory changed may miss entries
+# created within the same timestamp tick, so it is not trusted on the next scan
+MTIME_SETTLE_SECONDS = 2.0
+
+
+def suffix_set(extensions):
+    """Normalize extensions like "mp4" or ".MP4" into a frozenset for suffix lookups"""
+    return frozenset("." + ext.lower().lstrip(".") for ext in extensions)
+
+
+def nested_folder_pattern(root, folder):
+    """Exclude pattern for folder if it lies inside root (e.g. an output folder), else None"""
+    relative = os.path.relpath(os.path.abspath(folder), os.path.abspath(root))
+    if relative == "." or relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        return None
+    return relative.replace(os.sep, "/")
+
+
+def _matches(relative_path, patterns):
+    return any(fnmatch.fnmatch(relative_path, pattern) for pattern in patterns)
+
+
+def path_excluded(relative_path, exclude):
+    """True if a relative path or any directory above it matches an exclude pattern"""
+    parts = relative_path.split("/")
+    return any(_matches("/".join(parts[:depth]), exclude) for depth in range(1, len(parts) + 1))
+
+
+def path_selected(relative_path, suffixes, include=None, exclude=None):
+    """Apply scan_files' rules to a single path relative to the scan root ("/" separators)
+
+    Used for files reported by other means than a scan, e.g. file system
+    events; a file inside an excluded directory is rejected as well.
+    """
+    if os.path.splitext(relative_path)[1].lower() not in suffixes:
+        return False
+    if include and not _matches(relative_path, include):
+        return False
+    return not (exclude and path_excluded(relative_path, exclude))
+
+
+class DirectorySnapshot:
+    """On-disk record of directory listings keyed by directory mtime
+
+    A directory's mtime changes whenever entries are added, removed or
+    renamed in it, so an unchanged mtime means the stored listing is still
+    valid and the directory does not have to be read again.
+    """
+
+    def __init__(self, db_path=SCAN_SNAPSHOT_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            " path TEXT PRIMARY KEY,"
+            " mtime_ns INTEGER NOT NULL,"
+            " listed_at REAL NOT NULL,"
+            " files TEXT NOT NULL,"
+            " subdirs TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, path, mtime_ns):
+        """Return (files, subdirs) stored for a directory if its mtime is unchanged, else None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns, listed_at, files, subdirs FROM dirs WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None or row[0] != mtime_ns or row[1] - mtime_ns / 1e9 < MTIME_SETTLE_SECONDS:
+            return None
+        return json.loads(row[2]), json.loads(row[3])
+
+    def put(self, path, mtime_ns, files, subdirs):
+        """Store the listing of a directory"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dirs (path, mtime_ns, listed_at, files, subdirs) VALUES (?, ?, ?, ?, ?)",
+                (path, mtime_ns, time.time(), json.dumps(files), json.dumps(subdirs))
+            )
+
+    def close(self):
+        """Commit and close the database"""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+def _list_directory(path):
+    """Return sorted (file names, subdirectory names) of a directory"""
+    files, subdirs = [], []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file():
+                    files.append(entry.name)
+            except OSError:
+                continue
+    return sorted(files), sorted(subdirs)
+
+
+def scan_files(root, extensions, recursive=True, include=None, exclude=None, snapshot=None):
+    """Yield files below root whose suffix is in extensions, as they are found
+
+    include and exclude are glob patterns matched against the path relative
+    to root using "/" separators; a file must match one include pattern (if
+    any are given) and no exclude pattern. Excluded directories are not
+    entered. With a DirectorySnapshot, directories whose mtime is unchanged
+    since the last scan are not read again.
+    """
+    suffixes = extensions if isinstance(extensions, frozenset) else suffix_set(extensions)
+    include = list(include or [])
+    exclude = list(exclude or [])
+    pending = [(root, "")]
+    while pending:
+        path, relative = pending.pop()
+        listing = None
+        try:
+            if snapshot is not None:
+                mtime_ns = os.stat(path).st_mtime_ns
+                listing = snapshot.get(os.path.abspath(path), mtime_ns)
+            if listing is None:
+                listing = _list_directory(path)
+                if snapshot is not None:
+                    snapshot.put(os.path.abspath(path), mtime_ns, *listing)
+        except OSError:
+            continue
+        files, subdirs = listing
+
+        for name in files:
+            if os.path.splitext(name)[1].lower() not in suffixes:
+                continue
+            relative_name = relative + name
+            if include and not _matches(relative_name, include):
+                continue
+            if exclude and _matches(relative_name, exclude):
+                continue
+            yield os.path.join(path, name)
+
+        if recursive:
+            # Pushed in reverse so directories are visited in name order
+            for name in reversed(subdirs):
+                relative_name = relative + name
+                if exclude and _matches(relative_name, exclude):
+                    continue
+                pending.append((os.path.join(path, name), relative_name + "/"))
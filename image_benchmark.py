@@ -0,0 +1,77 @@
+"""Compare image conversion throughput of the available backends
+
+Generates synthetic test images in a temporary folder, converts them with
+one ImageMagick process per file, with batched ImageMagick processes and,
+if installed, in-process with Pillow, and prints files/second per mode.
+
+Example:
+    python image_benchmark.py --files 500 --size 160x120 --format jpg
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import image_engine
+import pillow_backend
+
+
+def make_images(magick_path, folder, count, size):
+    """Create count copies of a synthetic PNG image"""
+    source = os.path.join(folder, "source.png")
+    subprocess.run([magick_path, "-size", size, "gradient:red-blue", "-swirl", "90", source], check=True)
+    input_folder = os.path.join(folder, "input")
+    os.makedirs(input_folder)
+    for index in range(count):
+        shutil.copyfile(source, os.path.join(input_folder, f"image_{index:05d}.png"))
+    return input_folder
+
+
+def run_mode(input_folder, output_folder, output_format, workers, batch_size, backend):
+    """Convert the test images and return files per second"""
+    start = time.monotonic()
+    succeeded, failed = image_engine.convert_images(input_folder, output_folder, "png", output_format,
+                                                    workers=workers, batch_size=batch_size, backend=backend,
+                                                    log=lambda message: None)
+    elapsed = time.monotonic() - start
+    if failed:
+        print(f"  {failed} files failed")
+    return succeeded / elapsed if elapsed else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark image conversion backends.")
+    parser.add_argument("--files", type=int, default=200, help="number of test images (default: 200)")
+    parser.add_argument("--size", default="160x120", help="test image size (default: 160x120)")
+    parser.add_argument("--format", default="jpg", choices=image_engine.OUTPUT_FORMATS, help="output format")
+    parser.add_argument("--workers", type=int, default=None, help="parallel processes (default: one per core)")
+    parser.add_argument("--batch-size", type=int, default=image_engine.DEFAULT_BATCH_SIZE,
+                        help=f"files per process in batched mode (default: {image_engine.DEFAULT_BATCH_SIZE})")
+    args = parser.parse_args(argv)
+
+    magick_path = image_engine.find_magick()
+    if not os.path.exists(magick_path):
+        print(f"ImageMagick not found at {magick_path}", file=sys.stderr)
+        return 2
+
+    work_dir = tempfile.mkdtemp(prefix="image_benchmark_")
+    try:
+        input_folder = make_images(magick_path, work_dir, args.files, args.size)
+        print(f"{args.files} images of {args.size} px, png -> {args.format}")
+        modes = [("per-file", 1, image_engine.BACKEND_MAGICK),
+                 (f"batched ({args.batch_size})", args.batch_size, image_engine.BACKEND_MAGICK)]
+        if pillow_backend.supports("png", args.format):
+            modes.append(("pillow", 1, image_engine.BACKEND_PILLOW))
+        for index, (label, batch_size, backend) in enumerate(modes):
+            rate = run_mode(input_folder, os.path.join(work_dir, f"out_{index}"),
+                            args.format, args.workers, batch_size, backend)
+            print(f"  {label:<16} {rate:8.1f} files/s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+import os
+import shutil
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import pillow_backend
+from thread_budget import available_cores
+from file_scanner import nested_folder_pattern, scan_files
+from output_plan import OutputPlanner
+from job_journal import PARTIAL_PATTERNS
+
+INPUT_FORMATS = ["heic", "png", "jpeg", "jpg", "webp"]
+OUTPUT_FORMATS = ["jpg", "png", "jpeg", "webp", "heic"]
+
+# Extensions that name the same format
+FORMAT_ALIASES = {"jpg": ["jpg", "jpeg"], "jpeg": ["jpg", "jpeg"]}
+
+# Conversion backends; "auto" uses Pillow for the formats it handles and ImageMagick otherwise
+BACKEND_AUTO = "auto"
+BACKEND_PILLOW = "pillow"
+BACKEND_MAGICK = "magick"
+BACKENDS = [BACKEND_AUTO, BACKEND_PILLOW, BACKEND_MAGICK]
+
+# Files per ImageMagick process in batched mode
+DEFAULT_BATCH_SIZE = 64
+
+# Total length of the file names passed to one batch (Windows allows 32767 characters)
+BATCH_MAX_CHARS = 24000
+
+
+def find_magick():
+    """Locate ImageMagick in the bundled bin directory, falling back to PATH"""
+    magick_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bin', 'imagemagick', 'magick.exe')
+    if os.path.exists(magick_path) and os.name == "nt":
+        return magick_path
+    return shutil.which("magick") or magick_path
+
+
+def find_image_files(input_folder, input_format, recursive=False, exclude=None):
+    """List input images of the given format, matching extensions case-insensitively"""
+    extensions = FORMAT_ALIASES.get(input_format.lower(), [input_format])
+    return list(scan_files(input_folder, extensions, recursive, exclude=exclude))
+
+
+def build_command(magick_path, input_file, output_file, output_format, quality):
+    """ImageMagick command converting one file"""
+    command = [
+        magick_path,
+        "convert",
+        input_file
+    ]
+
+    # Add JPEG quality option if needed
+    if output_format.lower() in ["jpg", "jpeg"]:
+        command.extend(["-quality", str(quality)])
+
+    command.append(output_file)
+    return command
+
+
+def build_batch_command(magick_path, input_files, output_dir, output_format, quality):
+    """ImageMagick mogrify command converting several files into one directory"""
+    command = [
+        magick_path,
+        "mogrify",
+        "-path", output_dir,
+        "-format", output_format
+    ]
+
+    # Add JPEG quality option if needed
+    if output_format.lower() in ["jpg", "jpeg"]:
+        command.extend(["-quality", str(quality)])
+
+    command.extend(input_files)
+    return command
+
+
+def plan_batches(jobs, batch_size, max_chars=BATCH_MAX_CHARS):
+    """Group (input_file, output_file) pairs into batches sharing an output directory
+
+    A batch holds at most batch_size files and its file names stay below
+    max_chars in total so the command line fits the Windows limit.
+    """
+    by_dir = {}
+    for job in jobs:
+        by_dir.setdefault(os.path.dirname(job[1]), []).append(job)
+
+    batches = []
+    for output_dir, dir_jobs in by_dir.items():
+        batch, chars = [], 0
+        for job in dir_jobs:
+            if batch and (len(batch) >= batch_size or chars + len(job[0]) + 3 > max_chars):
+                batches.append((output_dir, batch))
+                batch, chars = [], 0
+            batch.append(job)
+            chars += len(job[0]) + 3
+        batches.append((output_dir, batch))
+    return batches
+
+
+def convert_images(input_folder, output_folder, input_format, output_format, quality=80,
+                   recursive=False, workers=None, batch_size=1, backend=BACKEND_AUTO, cancel_event=None,
+                   log=print, on_total=None, on_result=None):
+    """Convert all matching images in a folder in parallel; returns (succeeded, failed)
+
+    workers defaults to one ImageMagick process per core. With batch_size
+    above 1, each ImageMagick process converts up to that many files, which
+    saves the process startup per file for small images; files of a batch
+    that fails are retried one by one so a bad file only fails itself.
+    Setting cancel_event stops batches that have not started yet; their
+    files count as neither succeeded nor failed. on_result(input_file, error)
+    is called from worker threads for every finished file, with error None
+    on success.
+
+    With the auto backend, format pairs Pillow supports are converted
+    in-process and files Pillow fails on are retried with ImageMagick.
+    Raises FileNotFoundError if ImageMagick is needed but missing, and
+    ValueError if the pillow backend is forced for a pair it cannot handle.
+    """
+    # Ensure output folder exists
+    os.makedirs(output_folder, exist_ok=True)
+
+    # Temporary outputs and an output folder inside the input folder (the "converted" default) are not scanned
+    exclude = list(PARTIAL_PATTERNS)
+    output_pattern = nested_folder_pattern(input_folder, output_folder)
+    if output_pattern:
+        exclude.append(output_pattern)
+    input_files = find_image_files(input_folder, input_format, recursive, exclude)
+    if on_total:
+        on_total(len(input_files))
+    if not input_files:
+        return 0, 0
+
+    use_pillow = backend != BACKEND_MAGICK and pillow_backend.supports(input_format, output_format)
+    if backend == BACKEND_PILLOW and not use_pillow:
+        raise ValueError(f"Pillow cannot convert {input_format} to {output_format}")
+
+    magick_path = find_magick()
+    if not os.path.exists(magick_path):
+        if not use_pillow:
+            raise FileNotFoundError(f"ImageMagick not found at {magick_path}")
+        magick_path = None
+
+    log("Backend: Pillow" if use_pillow else "Backend: ImageMagick")
+
+    # Outputs mirror the input tree; names and directories are settled before any work starts
+    planner = OutputPlanner(input_folder, output_folder, output_format)
+    planner.reserve_inputs(input_files)
+    jobs = []
+    for input_file in input_files:
+        output_file, renamed = planner.add(input_file)
+        if renamed:
+            log(f"Renamed: {os.path.basename(input_file)} -> {os.path.relpath(output_file, output_folder)}")
+        jobs.append((input_file, output_file))
+    planner.create_directories()
+    workers = workers or available_cores()
+    if batch_size > 1 and not use_pillow:
+        # Smaller batches when there are few files, so that every worker gets one
+        # mogrify names outputs after their input, so renamed outputs are converted one by one
+        batchable = [job for job in jobs
+                     if os.path.splitext(os.path.basename(job[0]))[0] == os.path.splitext(os.path.basename(job[1]))[0]]
+        single = [job for job in jobs if job not in batchable]
+        batches = plan_batches(batchable, max(1, min(batch_size, -(-len(jobs) // workers))))
+        batches += [(os.path.dirname(job[1]), [job]) for job in single]
+    else:
+        batches = [(os.path.dirname(job[1]), [job]) for job in jobs]
+
+    workers = max(1, min(workers, len(batches)))
+    env = None
+    if workers > 1:
+        # Parallelism comes from the pool; ImageMagick's own threads would oversubscribe the cores
+        env = dict(os.environ, MAGICK_THREAD_LIMIT="1")
+
+    counts = {"succeeded": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def report(input_file, error):
+        file_name = os.path.basename(input_file)
+        if error is None:
+            log(f"Success: {file_name}")
+        else:
+            log(f"Error: {file_name} - {str(error)}")
+        with lock:
+            counts["failed" if error else "succeeded"] += 1
+        if on_result:
+            on_result(input_file, error)
+
+    def convert_one(input_file, output_file):
+        if use_pillow:
+            try:
+                pillow_backend.convert(input_file, output_file, output_format, quality)
+                return None
+            except Exception as e:
+                if magick_path is None or backend == BACKEND_PILLOW:
+                    return e
+        try:
+            subprocess.run(build_command(magick_path, input_file, output_file, output_format, quality),
+                           check=True, env=env)
+            return None
+        except Exception as e:
+            return e
+
+    def convert_batch(batch):
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        output_dir, batch_jobs = batch
+        if len(batch_jobs) == 1:
+            report(batch_jobs[0][0], convert_one(*batch_jobs[0]))
+            return
+
+        # Stale outputs would hide files the batch failed to write
+        for _, output_file in batch_jobs:
+            if os.path.exists(output_file):
+                os.remove(output_file)
+        try:
+            subprocess.run(build_batch_command(magick_path, [input_file for input_file, _ in batch_jobs],
+                                               output_dir, output_format, quality),
+                           check=True, env=env, stderr=subprocess.DEVNULL)
+        except Exception:
+            # Outputs of a failed batch may be half-written, so every file is converted again on its own
+            for input_file, output_file in batch_jobs:
+                if os.path.exists(output_file):
+                    os.remove(output_file)
+                report(input_file, convert_one(input_file, output_file))
+            return
+        # Files the batch did not write are retried on their own to get their error
+        for input_file, output_file in batch_jobs:
+            if os.path.exists(output_file):
+                report(input_file, None)
+            else:
+                report(input_file, convert_one(input_file, output_file))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(convert_batch, batches))
+
+    skipped = len(input_files) - counts["succeeded"] - counts["failed"]
+    if skipped:
+        log(f"Cancelled: {skipped} files not converted")
+    return counts["succeeded"], counts["failed"]
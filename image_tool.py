@@ -1,9 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, filedialog
 import os
-import subprocess
 import json
-import glob
+import queue
+import threading
+import image_engine
+from ui_queue import UIQueueMixin
 
 # Hard-coded English language configuration
 DEFAULT_LANGUAGES = {
@@ -20,7 +22,12 @@ DEFAULT_LANGUAGES = {
     "error_no_io_folders": "Please select input and output folders.",
     "no_files_found": "No files found to convert.",
     "conversion_complete": "Conversion completed.",
-    "conversion_failed": "Conversion failed"
+    "conversion_failed": "Conversion failed",
+    "image_workers_label": "Parallel Jobs:",
+    "cancel_button": "Cancel",
+    "conversion_cancelled": "Conversion cancelled",
+    "converting_images": "Converting...",
+    "batch_mode": "Batch small images"
 }
 
 # Load language configuration from config.json
@@ -38,7 +45,10 @@ try:
 except Exception as e:
     print(f"Error loading language configuration: {e}")
 
-class ImageConverterTab(ttk.Frame):
+# "auto" uses one ImageMagick process per core
+AUTO_WORKERS = "auto"
+
+class ImageConverterTab(UIQueueMixin, ttk.Frame):
     def __init__(self, parent, language):
         super().__init__(parent)
         self.language = "en"  
@@ -58,6 +68,11 @@ class ImageConverterTab(ttk.Frame):
         self.successful_files = tk.IntVar(value=0)
         self.failed_files = tk.IntVar(value=0)
         self.jpeg_quality = tk.IntVar(value=80)  # Add JPEG quality variable
+        self.workers = tk.StringVar(value=AUTO_WORKERS)
+        self.batch_mode = tk.BooleanVar(value=False)
+        self.ui_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.converting = False
 
         # Create the UI on the image tab
         self.create_widgets()
@@ -128,8 +143,23 @@ class ImageConverterTab(ttk.Frame):
         self.quality_slider.grid(row=4, column=1, sticky=tk.W, padx=5, pady=5)
         self.update_quality_state(None)  # Initial state
 
-        # Convert button
-        ttk.Button(main_frame, text=LANGUAGES["convert_button"], command=self.convert_images).grid(row=5, column=1, pady=20)
+        # Parallel jobs
+        ttk.Label(main_frame, text=LANGUAGES["image_workers_label"]).grid(row=4, column=2, sticky=tk.E)
+        ttk.Combobox(
+            main_frame,
+            textvariable=self.workers,
+            values=[AUTO_WORKERS, 1, 2, 4, 8, 16],
+            width=6
+        ).grid(row=4, column=3, sticky=tk.W, padx=5, pady=5)
+        ttk.Checkbutton(main_frame, text=LANGUAGES["batch_mode"], variable=self.batch_mode).grid(
+            row=3, column=2, columnspan=2, sticky=tk.W, padx=5)
+
+        # Convert and cancel buttons
+        self.convert_button = ttk.Button(main_frame, text=LANGUAGES["convert_button"], command=self.convert_images)
+        self.convert_button.grid(row=5, column=1, pady=20)
+        self.cancel_button = ttk.Button(main_frame, text=LANGUAGES["cancel_button"], command=self.cancel_conversion,
+                                        state="disabled")
+        self.cancel_button.grid(row=5, column=2, pady=20)
 
         # Move status label, file count, and log area to the bottom left
         bottom_left_frame = ttk.Frame(main_frame)
@@ -185,67 +215,95 @@ class ImageConverterTab(ttk.Frame):
         quality = int(float(value))
         self.quality_label.config(text=LANGUAGES["jpeg_quality_label"] + f"{quality}%")
 
+    def record_result(self, input_file, error):
+        """Count a converted or failed image"""
+        if error is None:
+            self.successful_files.set(self.successful_files.get() + 1)
+        else:
+            self.failed_files.set(self.failed_files.get() + 1)
+
+    def append_log(self, message):
+        """Add a line to the log (Tk thread only)"""
+        self.log_text.insert(tk.END, message + "\n")
+        self.log_text.see(tk.END)
+
     def convert_images(self):
-        """Convert images using ImageMagick"""
+        """Convert images using ImageMagick in a background thread"""
+        if self.converting:
+            return
+
         input_folder = self.input_folder.get()
         output_folder = self.output_folder.get()
-        input_format = self.input_format.get()
-        output_format = self.output_format.get()
 
         if not input_folder or not output_folder:
             self.status.set(LANGUAGES["error_no_io_folders"])
             return
 
+        workers = self.workers.get()
         try:
-            # Ensure output folder exists
-            os.makedirs(output_folder, exist_ok=True)
-
-            # Get list of input files
-            input_files = glob.glob(os.path.join(input_folder, f"*.{input_format}"))
-            self.total_files.set(len(input_files))
-            self.successful_files.set(0)
-            self.failed_files.set(0)
-            self.log_text.delete(1.0, tk.END)
-
-            if not input_files:
-                self.status.set(LANGUAGES["no_files_found"])
-                return
-
-            for index, input_file in enumerate(input_files):
-                file_name = os.path.basename(input_file)
-                output_file = os.path.join(output_folder, os.path.splitext(file_name)[0] + f".{output_format}")
-
-                # Check ImageMagick path
-                magick_path = os.path.join(os.path.dirname(__file__), 'bin', 'imagemagick', 'magick.exe')
-                if not os.path.exists(magick_path):
-                    raise FileNotFoundError(f"ImageMagick not found at {magick_path}")
-
-                # Constructing ImageMagick commands
-                command = [
-                    magick_path,
-                    "convert",
-                    input_file
-                ]
-
-                # Add JPEG quality option if needed
-                if output_format.lower() in ["jpg", "jpeg"]:
-                    command.extend(["-quality", str(self.jpeg_quality.get())])
-
-                command.append(output_file)
-
-                try:
-                    # Run the command
-                    subprocess.run(command, check=True)
-                    self.successful_files.set(self.successful_files.get() + 1)
-                    log_msg = f"Success: {file_name}"
-                    self.log_text.insert(tk.END, log_msg + "\n")
-                except Exception as e:
-                    self.failed_files.set(self.failed_files.get() + 1)
-                    log_msg = f"Error: {file_name} - {str(e)}"
-                    self.log_text.insert(tk.END, log_msg + "\n")
-
-            self.status.set(LANGUAGES["conversion_complete"])
+            workers = None if workers == AUTO_WORKERS else max(1, int(workers))
+        except ValueError:
+            workers = None
+
+        self.total_files.set(0)
+        self.successful_files.set(0)
+        self.failed_files.set(0)
+        self.log_text.delete(1.0, tk.END)
+        self.status.set(LANGUAGES["converting_images"])
+        self.cancel_event.clear()
+        self.converting = True
+        self.convert_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.start_ui_queue()
+
+        thread = threading.Thread(target=self.perform_conversion, args=(
+            input_folder,
+            output_folder,
+            self.input_format.get(),
+            self.output_format.get(),
+            self.jpeg_quality.get(),
+            workers,
+            image_engine.DEFAULT_BATCH_SIZE if self.batch_mode.get() else 1
+        ))
+        thread.daemon = True
+        thread.start()
+
+    def cancel_conversion(self):
+        """Stop starting new files; conversions already running are finished"""
+        self.cancel_event.set()
+        self.cancel_button.config(state="disabled")
+
+    def perform_conversion(self, input_folder, output_folder, input_format, output_format, quality, workers,
+                           batch_size):
+        """Run the batch off the Tk thread, reporting back through the UI queue"""
+        try:
+            image_engine.convert_images(
+                input_folder,
+                output_folder,
+                input_format,
+                output_format,
+                quality=quality,
+                workers=workers,
+                batch_size=batch_size,
+                cancel_event=self.cancel_event,
+                log=lambda message: self.call_in_ui(self.append_log, message),
+                on_total=lambda count: self.call_in_ui(self.total_files.set, count),
+                on_result=lambda input_file, error: self.call_in_ui(self.record_result, input_file, error)
+            )
+            self.call_in_ui(self.finish_conversion, None)
         except Exception as e:
-            self.status.set(f"{LANGUAGES['conversion_failed']}: {str(e)}")
-        finally:
-            self.log_text.see(tk.END)
\ No newline at end of file
+            self.call_in_ui(self.finish_conversion, e)
+
+    def finish_conversion(self, error):
+        """Show the final status once the batch thread has finished (Tk thread only)"""
+        self.converting = False
+        self.convert_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+        if error is not None:
+            self.status.set(f"{LANGUAGES['conversion_failed']}: {str(error)}")
+        elif not self.total_files.get():
+            self.status.set(LANGUAGES["no_files_found"])
+        elif self.cancel_event.is_set():
+            self.status.set(LANGUAGES["conversion_cancelled"])
+        else:
+            self.status.set(LANGUAGES["conversion_complete"])
\ No newline at end of file
@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# Journal database lives next to config.json
+JOB_JOURNAL_FILE = "job_journal.db"
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Exclude patterns (see file_scanner.scan_files) matching partial_path() names at any depth
+PARTIAL_PATTERNS = [".*.partial.*", "*/.*.partial.*"]
+
+
+def partial_path(output_file):
+    """Temporary name an output is written to before being renamed into place
+
+    The extension is kept so that ffmpeg still picks the right muxer.
+    """
+    folder, name = os.path.split(output_file)
+    base, ext = os.path.splitext(name)
+    return os.path.join(folder, f".{base}.partial{ext}")
+
+
+def commit_output(temp_file, output_file):
+    """Atomically move a finished output into place"""
+    os.replace(temp_file, output_file)
+
+
+def fingerprint(path):
+    """Return (size, mtime_ns) of a file, or None if it cannot be read"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class JobJournal:
+    """Persistent per-output record of batch progress
+
+    Every output file has one row with its state, the fingerprint of the
+    input it was made from and the encode settings used. A restarted batch
+    only trusts outputs recorded as done for an unchanged input and
+    identical settings; everything else is converted again. State changes
+    are committed immediately so a crash loses at most the running jobs.
+    """
+
+    def __init__(self, db_path=JOB_JOURNAL_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " output_path TEXT PRIMARY KEY,"
+            " input_path TEXT NOT NULL,"
+            " size INTEGER,"
+            " mtime_ns INTEGER,"
+            " settings TEXT,"
+            " state TEXT NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def add_pending(self, jobs):
+        """Record (input_file, output_file) pairs not seen before as pending
+
+        A pair whose output is its own input is never recorded, so the
+        source is not mistaken for an output later.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (output_path, input_path, state, updated) VALUES (?, ?, ?, ?)",
+                [(os.path.abspath(output_file), os.path.abspath(input_file), PENDING, now)
+                 for input_file, output_file in jobs
+                 if os.path.abspath(output_file) != os.path.abspath(input_file)]
+            )
+            self._conn.commit()
+
+    def lookup(self, output_file):
+        """Return the journal entry of an output as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT input_path, size, mtime_ns, settings, state FROM jobs WHERE output_path = ?",
+                (os.path.abspath(output_file),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"input_path": row[0], "size": row[1], "mtime_ns": row[2],
+                "settings": json.loads(row[3]) if row[3] else None, "state": row[4]}
+
+    def is_done(self, input_file, output_file, settings):
+        """True if the output exists and was completed from this input with these settings"""
+        entry = self.lookup(output_file)
+        if entry is None or entry["state"] != DONE or not os.path.exists(output_file):
+            return False
+        return ((entry["size"], entry["mtime_ns"]) == fingerprint(input_file) and
+                entry["settings"] == settings)
+
+    def mark(self, input_file, output_file, state, settings=None):
+        """Record the state of an output together with the current input fingerprint"""
+        if os.path.abspath(output_file) == os.path.abspath(input_file):
+            return
+        size, mtime_ns = fingerprint(input_file) or (None, None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (output_path, input_path, size, mtime_ns, settings, state, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(output_file), os.path.abspath(input_file), size, mtime_ns,
+                 json.dumps(settings) if settings is not None else None, state, time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,76 @@
+import heapq
+import statistics
+
+# Job orders offered in the GUI
+ORDER_LONGEST_FIRST = "longest"
+ORDER_SHORTEST_FIRST = "shortest"
+ORDER_DISCOVERY = "fifo"
+
+# Rough encoder throughput of one worker in pixel-seconds of content per
+# wall-clock second (1080p encoded in real time). Only used for reporting.
+PIXEL_RATE_PER_WORKER = 1920 * 1080
+
+# A remux only moves bytes, so it costs a small fraction of an encode
+COPY_COST_FACTOR = 0.02
+
+
+def estimate_cost(info, mode="transcode"):
+    """Estimate the work of converting a file as duration x pixel count
+
+    Returns None when the probe result does not allow an estimate.
+    """
+    if not info or not info.get("duration") or not info.get("video"):
+        return None
+    video = info["video"][0]
+    pixels = (video.get("width") or 0) * (video.get("height") or 0)
+    if not pixels:
+        return None
+    cost = info["duration"] * pixels
+    if mode == "copy":
+        cost *= COPY_COST_FACTOR
+    return cost
+
+
+def fill_missing_costs(costs):
+    """Replace unknown costs with the median of the known ones"""
+    known = [cost for cost in costs if cost is not None]
+    fallback = statistics.median(known) if known else 1.0
+    return [fallback if cost is None else cost for cost in costs]
+
+
+def order_jobs(jobs, costs, order=ORDER_LONGEST_FIRST):
+    """Return (jobs, costs) sorted for the chosen order
+
+    Longest-processing-time-first keeps a huge file from becoming the
+    straggler at the end of a batch; shortest-first produces finished
+    files as early as possible. Sorting is stable, so ties keep the
+    discovery order.
+    """
+    pairs = list(zip(jobs, costs))
+    if order == ORDER_LONGEST_FIRST:
+        pairs.sort(key=lambda pair: pair[1], reverse=True)
+    elif order == ORDER_SHORTEST_FIRST:
+        pairs.sort(key=lambda pair: pair[1])
+    return [job for job, _ in pairs], [cost for _, cost in pairs]
+
+
+def predict_makespan(costs, workers):
+    """Simulate handing jobs in order to the first free worker; return the total cost span"""
+    if not costs:
+        return 0.0
+    finish_times = [0.0] * max(1, workers)
+    for cost in costs:
+        start = heapq.heappop(finish_times)
+        heapq.heappush(finish_times, start + cost)
+    return max(finish_times)
+
+
+def cost_to_seconds(cost):
+    """Convert a cost estimate into approximate wall-clock seconds for one worker"""
+    return cost / PIXEL_RATE_PER_WORKER
+
+
+def format_duration(seconds):
+    """Format seconds as H:MM:SS"""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
@@ -0,0 +1,84 @@
+import queue
+import logging
+import tkinter as tk
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Full conversion logs are kept next to config.json
+LOG_FILE = "conversion.log"
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Lines kept in the log widget; older lines are only in the log file
+MAX_WIDGET_LINES = 2000
+
+# Widget flush interval (10 frames per second)
+FLUSH_INTERVAL_MS = 100
+
+
+class LogSink:
+    """Thread-safe log collector feeding a Tk text widget and a rotating log file
+
+    write() may be called from any thread. Lines are buffered and inserted
+    into the widget in one batch per frame on the Tk thread, and the widget
+    only keeps the most recent lines. Every line is also handed to a
+    background listener that appends it to a rotating file, so workers never
+    wait for disk or widget updates.
+    """
+
+    def __init__(self, name, log_file=LOG_FILE, max_lines=MAX_WIDGET_LINES):
+        self.max_lines = max_lines
+        self.widget = None
+        self._pending = deque(maxlen=max_lines)
+
+        self.logger = logging.getLogger(name)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self._listener = None
+        try:
+            file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES,
+                                               backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+            file_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            records = queue.Queue()
+            self.logger.handlers = [QueueHandler(records)]
+            self._listener = QueueListener(records, file_handler)
+            self._listener.start()
+        except OSError as e:
+            print(f"Unable to open log file {log_file}: {e}")
+
+    def attach(self, widget):
+        """Show log lines in the given text widget and start the flush loop"""
+        self.widget = widget
+        widget.after(FLUSH_INTERVAL_MS, self._flush_loop, widget)
+
+    def write(self, message):
+        """Record a log line; safe to call from any thread"""
+        self._pending.append(message)
+        self.logger.info(message)
+
+    def _flush_loop(self, widget):
+        # A widget replaced by attach() (e.g. after a language change) stops its loop
+        if widget is not self.widget or not widget.winfo_exists():
+            return
+        self.flush()
+        widget.after(FLUSH_INTERVAL_MS, self._flush_loop, widget)
+
+    def flush(self):
+        """Insert buffered lines into the widget and trim it to max_lines (Tk thread only)"""
+        if self.widget is None or not self._pending:
+            return
+        lines = []
+        while self._pending:
+            lines.append(self._pending.popleft())
+        self.widget.insert(tk.END, "\n".join(lines) + "\n")
+        # The text widget always ends with an empty line after the last newline
+        excess = int(self.widget.index("end-1c").split(".")[0]) - 1 - self.max_lines
+        if excess > 0:
+            self.widget.delete("1.0", f"{excess + 1}.0")
+        self.widget.see(tk.END)
+
+    def close(self):
+        """Stop the file listener, writing out any queued records"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
@@ -0,0 +1,68 @@
+import math
+import json
+from ffmpeg_runner import run_ffmpeg_quiet
+
+# EBU R128: integrated loudness, true peak and loudness range
+DEFAULT_TARGET = {"I": -23.0, "TP": -1.0, "LRA": 7.0}
+
+# loudnorm works at 192 kHz internally; outputs are resampled to the source rate or this one
+DEFAULT_SAMPLE_RATE = 48000
+
+MEASURED_KEYS = ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset")
+
+
+def parse_target(text):
+    """Parse "I:TP:LRA" such as "-23:-1:7" into a target dict
+
+    Raises ValueError for malformed or out of range values.
+    """
+    try:
+        integrated, true_peak, loudness_range = (float(part) for part in text.split(":"))
+    except ValueError:
+        raise ValueError(f"Loudness target must be I:TP:LRA, e.g. -23:-1:7, got {text}")
+    if not (-70 <= integrated <= -5 and -9 <= true_peak <= 0 and 1 <= loudness_range <= 50):
+        raise ValueError(f"Loudness target out of range: {text}")
+    return {"I": integrated, "TP": true_peak, "LRA": loudness_range}
+
+
+def cache_kind(target):
+    """Probe cache kind under which measurements for a target are stored"""
+    return f"loudnorm:{target['I']:g}:{target['TP']:g}:{target['LRA']:g}"
+
+
+def _target_options(target):
+    return f"I={target['I']:g}:TP={target['TP']:g}:LRA={target['LRA']:g}"
+
+
+def measure_loudness(ffmpeg_path, path, target, control=None):
+    """Run the loudnorm analysis pass over the first audio track of a file
+
+    Only the audio is decoded. Returns the measured values as floats;
+    raises FFmpegError if ffmpeg fails and ValueError if it printed no
+    measurements. control is an optional ffmpeg_runner.JobControl.
+    """
+    command = [
+        ffmpeg_path, '-hide_banner', '-nostdin', '-nostats',
+        '-i', path,
+        '-map', '0:a:0', '-vn', '-sn', '-dn',
+        '-af', f"loudnorm={_target_options(target)}:print_format=json",
+        '-f', 'null', '-'
+    ]
+    # The measurements are the last JSON object ffmpeg prints
+    stderr = run_ffmpeg_quiet(command, control)
+    try:
+        data = json.loads(stderr[stderr.rindex('{'):stderr.rindex('}') + 1])
+        return {key: float(data[key]) for key in MEASURED_KEYS}
+    except (ValueError, KeyError):
+        raise ValueError(f"loudnorm printed no measurements for {path}")
+
+
+def loudnorm_filter(target, measured, sample_rate=None):
+    """Audio filter for the second, linear loudnorm pass, or None for silent tracks"""
+    if not all(math.isfinite(measured[key]) for key in MEASURED_KEYS):
+        return None
+    return (f"loudnorm={_target_options(target)}"
+            f":measured_I={measured['input_i']:.2f}:measured_TP={measured['input_tp']:.2f}"
+            f":measured_LRA={measured['input_lra']:.2f}:measured_thresh={measured['input_thresh']:.2f}"
+            f":offset={measured['target_offset']:.2f}:linear=true,"
+            f"aresample={sample_rate or DEFAULT_SAMPLE_RATE}")
@@ -22,7 +22,7 @@ LANGUAGES = {
         "settings_saved": "Settings Saved",
         "settings_saved_msg": "Your settings have been saved successfully.",
         "tab_video": "Video",
-        "tab_audio": "Audio (Under Development)",
+        "tab_audio": "Audio",
         "tab_image": "Image ",
         "tab_settings": "Settings",
     }
@@ -62,13 +62,13 @@ class MainApp:
 
         # Create tabs
         self.video_tab = VideoConverterTab(self.notebook, self.language)
-        self.audio_tab = AudioConverterTab(self.notebook)
+        self.audio_tab = AudioConverterTab(self.notebook, self.language)
         self.image_tab = ImageConverterTab(self.notebook, self.language)
         self.setting_tab = ttk.Frame(self.notebook)
 
         # Add tabs to the notebook with initial labels
         self.notebook.add(self.video_tab, text="Video")
-        self.notebook.add(self.audio_tab, text="Audio (Under Development)")
+        self.notebook.add(self.audio_tab, text="Audio")
         self.notebook.add(self.image_tab, text="Image (Under Development)")
         self.notebook.add(self.setting_tab, text="Settings")
 
@@ -118,6 +118,12 @@ class MainApp:
     def on_closing(self):
         """Handle application close event, save preferences"""
         self.save_language_preference()
+        # Running batches are cancelled; ffmpeg processes still alive at exit are stopped by ffmpeg_runner
+        self.video_tab.cancel_conversion()
+        self.audio_tab.cancel_conversion()
+        self.image_tab.cancel_conversion()
+        self.video_tab.log_sink.close()
+        self.audio_tab.log_sink.close()
         self.root.destroy()
 
     def update_ui(self):
@@ -142,8 +148,9 @@ class MainApp:
         # Update tab labels
         self.update_tab_labels()
 
-        # Update video tab UI
-        self.video_tab.update_ui()
+        # Relabel the video and audio tabs; their settings and a running batch are kept
+        self.video_tab.create_widgets()
+        self.audio_tab.create_widgets()
 
     def create_settings_ui(self):
         """Create the settings tab UI"""
@@ -0,0 +1,233 @@
+import os
+import re
+import json
+import shutil
+import subprocess
+
+# Codecs each target container can hold without re-encoding.
+# None means the container accepts practically anything ffmpeg can mux.
+CONTAINER_CODECS = {
+    "mp4": {
+        "video": {"h264", "hevc", "mpeg4", "av1", "vp9"},
+        "audio": {"aac", "mp3", "ac3", "eac3", "alac", "opus"},
+    },
+    "mov": {
+        "video": {"h264", "hevc", "mpeg4", "prores", "mjpeg"},
+        "audio": {"aac", "mp3", "ac3", "alac", "pcm_s16le", "pcm_s24le"},
+    },
+    "mkv": {
+        "video": None,
+        "audio": None,
+    },
+    "avi": {
+        "video": {"mpeg4", "msmpeg4v3", "mjpeg", "h264"},
+        "audio": {"mp3", "ac3", "pcm_s16le"},
+    },
+    "flv": {
+        "video": {"h264", "flv1"},
+        "audio": {"aac", "mp3"},
+    },
+    "wmv": {
+        "video": {"wmv1", "wmv2", "wmv3", "vc1"},
+        "audio": {"wmav1", "wmav2"},
+    },
+}
+
+# Arguments used whenever a stream has to be re-encoded and no profile is given
+TRANSCODE_VIDEO_ARGS = ['-c:v', 'libx264', '-preset', 'medium', '-crf', '23']
+TRANSCODE_AUDIO_ARGS = ['-c:a', 'aac', '-b:a', '128k']
+
+
+def find_ffprobe(ffmpeg_path):
+    """Locate ffprobe next to the ffmpeg binary, falling back to PATH"""
+    folder = os.path.dirname(ffmpeg_path)
+    for name in ("ffprobe.exe", "ffprobe"):
+        candidate = os.path.join(folder, name)
+        if os.path.isfile(candidate):
+            return candidate
+    return shutil.which("ffprobe")
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_probe_output(data):
+    """Reduce raw ffprobe JSON to the fields the converter makes decisions on"""
+    fmt = data.get("format", {})
+    info = {
+        "format_name": fmt.get("format_name"),
+        "duration": _to_float(fmt.get("duration")),
+        "bit_rate": _to_int(fmt.get("bit_rate")),
+        "video": [],
+        "audio": [],
+    }
+    for stream in data.get("streams", []):
+        codec_type = stream.get("codec_type")
+        if codec_type == "video":
+            # Cover art is reported as a video stream; it is not part of the movie
+            if stream.get("disposition", {}).get("attached_pic"):
+                continue
+            info["video"].append({
+                "codec": stream.get("codec_name"),
+                "width": _to_int(stream.get("width")),
+                "height": _to_int(stream.get("height")),
+                "pix_fmt": stream.get("pix_fmt"),
+                "frame_rate": stream.get("avg_frame_rate"),
+            })
+        elif codec_type == "audio":
+            info["audio"].append({
+                "codec": stream.get("codec_name"),
+                "channels": _to_int(stream.get("channels")),
+                "sample_rate": _to_int(stream.get("sample_rate")),
+            })
+    return info
+
+
+def probe_media(path, ffprobe_path):
+    """Run ffprobe on a file and return its summary, or None if probing failed"""
+    if not ffprobe_path:
+        return None
+    command = [
+        ffprobe_path,
+        '-v', 'error',
+        '-print_format', 'json',
+        '-show_format',
+        '-show_streams',
+        path
+    ]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        return parse_probe_output(json.loads(result.stdout.decode('utf-8', errors='replace')))
+    except (subprocess.SubprocessError, OSError, ValueError):
+        return None
+
+
+# Channel layouts ffmpeg prints instead of a channel count
+CHANNEL_LAYOUTS = {"mono": 1, "stereo": 2, "2.1": 3, "quad": 4, "5.0": 5, "5.1": 6, "6.1": 7, "7.1": 8}
+
+
+def _split_fields(text):
+    """Split a stream description at commas that are not inside parentheses"""
+    fields, depth, current = [], 0, ""
+    for char in text:
+        if char == "," and depth == 0:
+            fields.append(current.strip())
+            current = ""
+            continue
+        depth += (char == "(") - (char == ")")
+        current += char
+    fields.append(current.strip())
+    return fields
+
+
+def parse_ffmpeg_output(text):
+    """Build the same summary as parse_probe_output from the stream listing of "ffmpeg -i"
+
+    Returns None if the output does not describe an input file.
+    """
+    match = re.search(r"^Input #0, (.+?), from ", text, re.M)
+    if not match:
+        return None
+    info = {"format_name": match.group(1), "duration": None, "bit_rate": None, "video": [], "audio": []}
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", text)
+    if match:
+        hours, minutes, seconds = match.groups()
+        info["duration"] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    match = re.search(r"Duration: .*?bitrate: (\d+) kb/s", text)
+    if match:
+        info["bit_rate"] = int(match.group(1)) * 1000
+    for kind, description in re.findall(r"^\s*Stream #0:\d+\S*: (Video|Audio): (.*)$", text, re.M):
+        fields = _split_fields(description)
+        codec = fields[0].split()[0]
+        if kind == "Video":
+            # Cover art is reported as a video stream; it is not part of the movie
+            if "(attached pic)" in description:
+                continue
+            # Two to five digits each, so codec tags such as 0x31637661 are not taken for a size
+            size = re.search(r"\b(\d{2,5})x(\d{2,5})\b", description)
+            fps = re.search(r"([\d.]+) fps", description)
+            info["video"].append({
+                "codec": codec,
+                "width": int(size.group(1)) if size else None,
+                "height": int(size.group(2)) if size else None,
+                "pix_fmt": fields[1].split("(")[0] if len(fields) > 1 else None,
+                "frame_rate": fps.group(1) if fps else None,
+            })
+        else:
+            rate = re.search(r"(\d+) Hz", description)
+            # The field after the sample rate is a layout such as "stereo" or "5.1(side)", or "N channels"
+            layout = fields[2].split("(")[0].strip() if len(fields) > 2 else ""
+            channels = CHANNEL_LAYOUTS.get(layout)
+            if channels is None and layout.endswith(" channels"):
+                channels = _to_int(layout.split()[0])
+            info["audio"].append({
+                "codec": codec,
+                "channels": channels,
+                "sample_rate": int(rate.group(1)) if rate else None,
+            })
+    return info
+
+
+def probe_with_ffmpeg(path, ffmpeg_path):
+    """Summarize a file from the stream listing ffmpeg prints, for builds that ship without ffprobe"""
+    if not ffmpeg_path:
+        return None
+    # Without an output file ffmpeg lists the input and exits with an error, which is expected here
+    command = [ffmpeg_path, '-hide_banner', '-nostdin', '-i', path]
+    try:
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        return parse_ffmpeg_output(result.stderr.decode('utf-8', errors='replace'))
+    except (subprocess.SubprocessError, OSError):
+        return None
+
+
+def _streams_fit(streams, allowed):
+    if allowed is None:
+        return True
+    return all(stream["codec"] in allowed for stream in streams)
+
+
+def plan_codec_args(info, target_format, transcode_args=None):
+    """Choose ffmpeg codec arguments for a probed input and target container
+
+    Returns (video_args, audio_args, mode) where mode is "copy" when every
+    stream can be remuxed as-is, "partial" when only one kind of stream
+    needs encoding and "transcode" otherwise. transcode_args is the
+    (video_args, audio_args) pair of an encoding profile used for streams
+    that have to be re-encoded.
+    """
+    transcode_video, transcode_audio = transcode_args or (TRANSCODE_VIDEO_ARGS, TRANSCODE_AUDIO_ARGS)
+    target = CONTAINER_CODECS.get(target_format.lower())
+    if info is None or target is None or not info["video"]:
+        return list(transcode_video), list(transcode_audio), "transcode"
+
+    copy_video = _streams_fit(info["video"], target["video"])
+    copy_audio = _streams_fit(info["audio"], target["audio"])
+
+    if copy_video:
+        video_args = ['-c:v', 'copy']
+        # Players on Apple platforms only accept HEVC in MP4/MOV with the hvc1 tag
+        if target_format.lower() in ("mp4", "mov") and any(s["codec"] == "hevc" for s in info["video"]):
+            video_args += ['-tag:v', 'hvc1']
+    else:
+        video_args = list(transcode_video)
+    audio_args = ['-c:a', 'copy'] if copy_audio else list(transcode_audio)
+
+    if copy_video and copy_audio:
+        mode = "copy"
+    elif copy_video or copy_audio:
+        mode = "partial"
+    else:
+        mode = "transcode"
+    return video_args, audio_args, mode
@@ -0,0 +1,97 @@
+import os
+
+
+class OutputPlanner:
+    """Assign every input a unique output path mirroring its place below the input folder
+
+    Inputs that would map to the same output (clip.mov and clip.mkv, or
+    names differing only in case) keep the first name; later ones get the
+    source extension appended, e.g. clip_mkv.mp4. An output is never given
+    the name of an input, so with the output folder inside the input
+    folder clip.mp4 converted to mp4 becomes clip_mp4.mp4 instead of
+    replacing its source. Files must be added in a stable order (the
+    scanner's) so a rerun assigns the same names.
+
+    Until reserve_inputs() has been given the complete input list, inputs
+    not added yet are unknown, so any existing file the plan did not
+    produce counts as taken. earlier_output(input_file, path) may accept
+    such a file as a previous output of input_file so reruns keep its name.
+    """
+
+    def __init__(self, input_folder, output_folder, output_format, earlier_output=None):
+        self.input_folder = input_folder
+        self.output_folder = output_folder
+        self.output_format = output_format
+        self.earlier_output = earlier_output
+        self.outputs = {}
+        self.directories = set()
+        self._new_directories = set()
+        self._used = set()
+        self._inputs = set()
+        self._inputs_complete = False
+
+    @staticmethod
+    def _key(path):
+        # Compared case-insensitively so plans are also safe on Windows and macOS volumes
+        return os.path.normcase(path).lower()
+
+    def reserve_inputs(self, input_files):
+        """Keep outputs from taking the names of these inputs, e.g. all files of a scanned batch"""
+        self._inputs_complete = True
+        self._reserve(input_files)
+
+    def _reserve(self, input_files):
+        for input_file in input_files:
+            relative = os.path.relpath(input_file, self.output_folder)
+            if not relative.startswith(os.pardir):
+                self._inputs.add(self._key(relative))
+
+    def _taken(self, candidate, input_file):
+        key = self._key(candidate)
+        if key in self._used or key in self._inputs:
+            return True
+        if self._inputs_complete:
+            return False
+        # Streamed batches have not seen every input yet; an unplanned file may be one of them
+        path = os.path.join(self.output_folder, candidate)
+        return os.path.exists(path) and not (self.earlier_output and self.earlier_output(input_file, path))
+
+    def add(self, input_file):
+        """Plan the output of one input; returns (output path, True if it had to be renamed)"""
+        if input_file in self.outputs:
+            return self.outputs[input_file], False
+        # Files found while a batch runs are at least kept from replacing themselves
+        self._reserve([input_file])
+        relative = os.path.relpath(input_file, self.input_folder)
+        base, source_ext = os.path.splitext(relative)
+        candidate = f"{base}.{self.output_format}"
+        renamed = self._taken(candidate, input_file)
+        if renamed:
+            suffix = source_ext.lstrip(".").lower() or "file"
+            candidate = f"{base}_{suffix}.{self.output_format}"
+            counter = 2
+            while self._taken(candidate, input_file):
+                candidate = f"{base}_{suffix}_{counter}.{self.output_format}"
+                counter += 1
+        self._used.add(self._key(candidate))
+        output_file = os.path.join(self.output_folder, candidate)
+        self.outputs[input_file] = output_file
+        self.add_directory(os.path.dirname(output_file))
+        return output_file, renamed
+
+    def is_output(self, path):
+        """True if path is the planned output of an input added so far"""
+        relative = os.path.relpath(path, self.output_folder)
+        return not relative.startswith(os.pardir) and self._key(relative) in self._used
+
+    def add_directory(self, directory):
+        """Plan an extra output directory, e.g. for derived outputs"""
+        if directory not in self.directories:
+            self.directories.add(directory)
+            self._new_directories.add(directory)
+
+    def create_directories(self):
+        """Create the output directories planned since the last call"""
+        for directory in sorted(self._new_directories):
+            os.makedirs(directory, exist_ok=True)
+        self._new_directories.clear()
@@ -0,0 +1,81 @@
+"""Optional in-process image conversion with Pillow
+
+Pillow is used when it is installed and can read the input and write the
+output format; HEIC additionally needs pillow-heif. Everything else goes
+through ImageMagick.
+"""
+import os
+from job_journal import partial_path, commit_output
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+try:
+    import pillow_heif
+    pillow_heif.register_heif_opener()
+    HEIF_AVAILABLE = True
+except ImportError:
+    HEIF_AVAILABLE = False
+
+# File extension -> Pillow format name
+PILLOW_FORMATS = {
+    "jpg": "JPEG",
+    "jpeg": "JPEG",
+    "png": "PNG",
+    "webp": "WEBP",
+    "heic": "HEIF",
+}
+
+# Formats that cannot store an alpha channel or palette
+RGB_ONLY_FORMATS = {"JPEG"}
+
+
+def available():
+    """True if Pillow is installed"""
+    return Image is not None
+
+
+def format_supported(extension):
+    """True if Pillow can both read and write files with this extension"""
+    if Image is None:
+        return False
+    pillow_format = PILLOW_FORMATS.get(extension.lower())
+    if pillow_format == "WEBP":
+        return features.check("webp")
+    if pillow_format == "HEIF":
+        return HEIF_AVAILABLE
+    return pillow_format is not None
+
+
+def supports(input_format, output_format):
+    """True if the conversion can run in-process"""
+    return format_supported(input_format) and format_supported(output_format)
+
+
+def convert(input_file, output_file, output_format, quality=80):
+    """Convert one image in-process, keeping EXIF and ICC metadata"""
+    pillow_format = PILLOW_FORMATS[output_format.lower()]
+    with Image.open(input_file) as image:
+        info = image.info
+        if pillow_format in RGB_ONLY_FORMATS and image.mode not in ("RGB", "L", "CMYK"):
+            image = image.convert("RGB")
+
+        save_args = {}
+        if info.get("exif"):
+            save_args["exif"] = info["exif"]
+        if info.get("icc_profile"):
+            save_args["icc_profile"] = info["icc_profile"]
+        if pillow_format == "JPEG":
+            save_args["quality"] = quality
+
+        # Written to a temporary name so a failed save never leaves a truncated output behind
+        temp_file = partial_path(output_file)
+        try:
+            image.save(temp_file, format=pillow_format, **save_args)
+            commit_output(temp_file, output_file)
+        except Exception:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from media_probe import probe_media, probe_with_ffmpeg
+
+# Cache database lives next to config.json
+PROBE_CACHE_FILE = "probe_cache.db"
+
+# Least recently used entries beyond this count are dropped
+DEFAULT_MAX_ENTRIES = 200000
+
+# Number of writes buffered before committing to disk
+COMMIT_INTERVAL = 500
+
+# Kind of the summaries read from ffmpeg's input listing when ffprobe is missing
+FFMPEG_PROBE_KIND = "probe_ffmpeg"
+
+
+class ProbeCache:
+    """On-disk cache of per-file analysis results keyed by (path, size, mtime)
+
+    Entries are stored per "kind" so that besides ffprobe summaries other
+    expensive per-file measurements can reuse the same invalidation rules.
+    A file whose size or modification time changed is treated as a miss.
+    """
+
+    def __init__(self, db_path=PROBE_CACHE_FILE, max_entries=DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._writes_since_evict = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " path TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " data TEXT NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (path, kind))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(path):
+        """Return (normalized path, size, mtime_ns) for a file, or None if it cannot be read"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+    def _note_write(self):
+        self._pending += 1
+        if self._pending >= COMMIT_INTERVAL:
+            self._conn.commit()
+            self._pending = 0
+
+    def get(self, path, kind="probe"):
+        """Return the cached value for a file, or None if missing or stale"""
+        key = self._key(path)
+        if key is None:
+            return None
+        abs_path, size, mtime_ns = key
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, data FROM entries WHERE path = ? AND kind = ?",
+                (abs_path, kind)
+            ).fetchone()
+            if row is None or row[0] != size or row[1] != mtime_ns:
+                return None
+            self._conn.execute(
+                "UPDATE entries SET last_used = ? WHERE path = ? AND kind = ?",
+                (time.time(), abs_path, kind)
+            )
+            self._note_write()
+        return json.loads(row[2])
+
+    def put(self, path, value, kind="probe"):
+        """Store a JSON-serializable value for the current state of a file"""
+        key = self._key(path)
+        if key is None:
+            return
+        abs_path, size, mtime_ns = key
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (path, kind, size, mtime_ns, data, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (abs_path, kind, size, mtime_ns, json.dumps(value), time.time())
+            )
+            self._note_write()
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= COMMIT_INTERVAL:
+                self._evict()
+
+    def _evict(self):
+        """Drop the least recently used entries above max_entries (lock must be held)"""
+        self._writes_since_evict = 0
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self._conn.commit()
+            self._pending = 0
+
+    def probe(self, path, ffprobe_path, ffmpeg_path=None):
+        """Return the ffprobe summary for a file, running ffprobe only on a cache miss
+
+        Without ffprobe_path the summary is read from ffmpeg_path's input
+        listing. Those less detailed summaries are cached under their own
+        kind, so they are not used any more once ffprobe is available.
+        """
+        info = self.get(path)
+        if info is not None:
+            return info
+        kind = "probe"
+        if ffprobe_path:
+            info = probe_media(path, ffprobe_path)
+        else:
+            kind = FFMPEG_PROBE_KIND
+            info = self.get(path, kind)
+            if info is not None:
+                return info
+            info = probe_with_ffmpeg(path, ffmpeg_path)
+        # Failed probes are not cached so that transient errors are retried
+        if info is not None:
+            self.put(path, info, kind)
+        return info
+
+    def flush(self):
+        """Commit buffered writes and apply the size limit"""
+        with self._lock:
+            self._evict()
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        """Flush and close the database"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
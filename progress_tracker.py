@@ -0,0 +1,73 @@
+import threading
+
+
+class ProgressTracker:
+    """Aggregate progress of a batch, weighted by the media duration of each job
+
+    Jobs are identified by any hashable key. A job's weight is its duration
+    in seconds; progress reported by ffmpeg in seconds of output is compared
+    against it. Finished, skipped and failed jobs all count as fully done.
+    """
+
+    def __init__(self, total_weight=0.0):
+        self._lock = threading.Lock()
+        self.total_weight = total_weight
+        self.completed_weight = 0.0
+        self.active = {}
+
+    def add_weight(self, weight):
+        """Grow the batch total, e.g. for files found after the batch started"""
+        with self._lock:
+            self.total_weight += weight
+
+    def start(self, key, weight, name=None):
+        """Register a job that is about to run"""
+        with self._lock:
+            self.active[key] = {"name": name or str(key), "weight": weight, "done": 0.0, "speed": None, "fps": None}
+
+    def update(self, key, seconds, fps=None, speed=None):
+        """Record the latest ffmpeg progress for a running job"""
+        with self._lock:
+            job = self.active.get(key)
+            if job is None:
+                return
+            if seconds is not None:
+                job["done"] = min(max(seconds, 0.0), job["weight"])
+            if fps is not None:
+                job["fps"] = fps
+            if speed is not None:
+                job["speed"] = speed
+
+    def finish(self, key, weight=None):
+        """Credit a job as done; weight is needed for jobs that never started"""
+        with self._lock:
+            job = self.active.pop(key, None)
+            if job is not None:
+                weight = job["weight"]
+            self.completed_weight += weight or 0.0
+
+    def done_weight(self):
+        """Weight finished so far, including the progress of running jobs"""
+        with self._lock:
+            return self.completed_weight + sum(job["done"] for job in self.active.values())
+
+    def snapshot(self):
+        """Return (fraction done, overall ETA in seconds or None, list of active job dicts)"""
+        with self._lock:
+            jobs = []
+            done = self.completed_weight
+            total_speed = 0.0
+            for job in self.active.values():
+                done += job["done"]
+                left = job["weight"] - job["done"]
+                eta = None
+                if job["speed"]:
+                    total_speed += job["speed"]
+                    eta = left / job["speed"]
+                jobs.append(dict(job, eta=eta,
+                                 fraction=job["done"] / job["weight"] if job["weight"] else 0.0))
+            fraction = min(done / self.total_weight, 1.0) if self.total_weight else 0.0
+            # Work not started yet is assumed to run at the current aggregate speed
+            remaining = max(self.total_weight - done, 0.0)
+            overall_eta = remaining / total_speed if total_speed else None
+            return fraction, overall_eta, jobs
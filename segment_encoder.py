@@ -0,0 +1,121 @@
+import os
+import glob
+import shutil
+import tempfile
+import threading
+from ffmpeg_runner import run_ffmpeg
+
+# Segments shorter than this are not worth the split/concat overhead
+MIN_SEGMENT_SECONDS = 60
+
+# Work directories are created next to the output under this prefix
+WORK_DIR_PREFIX = ".segments_"
+
+# Exclude patterns (see file_scanner.scan_files) matching work directories at any depth
+WORK_DIR_PATTERNS = [WORK_DIR_PREFIX + "*", "*/" + WORK_DIR_PREFIX + "*"]
+
+
+def plan_segment_count(duration, max_segments, min_duration):
+    """Return how many segments a video should be split into (1 means encode whole)"""
+    if not duration or duration < min_duration or max_segments < 2:
+        return 1
+    return max(1, min(max_segments, int(duration // MIN_SEGMENT_SECONDS)))
+
+
+def _concat_line(path):
+    # The concat demuxer uses shell-like quoting for file names
+    return "file '" + path.replace("'", "'\\''") + "'\n"
+
+
+class SegmentedEncode:
+    """One input video encoded as independent keyframe-aligned segments
+
+    The video stream is cut at keyframes without re-encoding, every segment
+    is encoded separately so that several workers can share a single long
+    file, and the encoded segments are joined with the concat demuxer.
+    Audio is taken from the source in the final pass so that no encoder
+    priming gaps appear at segment boundaries.
+    """
+
+    def __init__(self, ffmpeg_path, video_file, output_file, video_args, audio_args, thread_args=([], []),
+                 control=None):
+        self.ffmpeg_path = ffmpeg_path
+        self.video_file = video_file
+        self.output_file = output_file
+        # Container tags such as hvc1 do nothing in the mkv segments; the concat into the final output sets them
+        self.video_args = list(video_args)
+        self.tag_args = []
+        if '-tag:v' in self.video_args:
+            index = self.video_args.index('-tag:v')
+            self.tag_args = self.video_args[index:index + 2]
+            del self.video_args[index:index + 2]
+        self.audio_args = audio_args
+        # (decoder, encoder) thread arguments applied to every segment encode
+        self.decoder_threads, self.encoder_threads = thread_args
+        # ffmpeg_runner.JobControl applied to every ffmpeg run of the job
+        self.control = control
+        self.work_dir = None
+        self.segments = []
+        self.failed = False
+        self.error = None
+        self._remaining = 0
+        self._lock = threading.Lock()
+
+    def split(self, segment_count, duration):
+        """Cut the video stream into roughly equal keyframe-aligned parts"""
+        # Keep the pieces on the output volume so the final concat is local I/O
+        self.work_dir = tempfile.mkdtemp(prefix=WORK_DIR_PREFIX, dir=os.path.dirname(self.output_file) or ".")
+        segment_time = duration / segment_count
+        command = [
+            self.ffmpeg_path, '-y',
+            '-i', self.video_file,
+            '-map', '0:v:0',
+            '-c', 'copy',
+            '-f', 'segment',
+            '-segment_time', f"{segment_time:.3f}",
+            '-reset_timestamps', '1',
+            os.path.join(self.work_dir, 'src_%04d.mkv')
+        ]
+        run_ffmpeg(command, control=self.control)
+        self.segments = sorted(glob.glob(os.path.join(self.work_dir, 'src_*.mkv')))
+        self._remaining = len(self.segments)
+        return len(self.segments)
+
+    def encoded_path(self, index):
+        return os.path.join(self.work_dir, f"enc_{index:04d}.mkv")
+
+    def encode_segment(self, index, on_progress=None):
+        """Encode one segment; safe to call from several worker threads at once"""
+        command = ([self.ffmpeg_path, '-y'] + self.decoder_threads + ['-i', self.segments[index], '-an'] +
+                   self.video_args + self.encoder_threads + [self.encoded_path(index)])
+        run_ffmpeg(command, on_progress, self.control)
+
+    def segment_done(self, success, error=None):
+        """Record a finished segment; returns True for the call that finished the last one"""
+        with self._lock:
+            if not success and not self.failed:
+                self.failed = True
+                self.error = error
+            self._remaining -= 1
+            return self._remaining == 0
+
+    def concat(self):
+        """Join the encoded segments and mux the source audio back in"""
+        list_file = os.path.join(self.work_dir, 'segments.txt')
+        with open(list_file, 'w', encoding='utf-8') as f:
+            for index in range(len(self.segments)):
+                f.write(_concat_line(self.encoded_path(index)))
+        command = [
+            self.ffmpeg_path, '-y',
+            '-f', 'concat', '-safe', '0', '-i', list_file,
+            '-i', self.video_file,
+            '-map', '0:v:0',
+            '-map', '1:a:0?',
+            '-c:v', 'copy'
+        ] + self.tag_args + self.audio_args + [self.output_file]
+        run_ffmpeg(command, control=self.control)
+
+    def cleanup(self):
+        """Remove the temporary segment directory"""
+        if self.work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
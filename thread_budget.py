@@ -0,0 +1,74 @@
+import os
+import statistics
+
+# Encoder threads that still pay off for a given frame height; beyond this
+# x264 gains little from extra threads and only adds frame lag and cache misses
+RESOLUTION_THREADS = [
+    (480, 2),
+    (720, 4),
+    (1080, 6),
+    (1440, 8),
+    (2160, 12),
+]
+MAX_USEFUL_THREADS = 16
+
+# Upper bound for the automatically chosen worker count
+MAX_AUTO_WORKERS = 16
+
+
+def available_cores():
+    """Number of CPU cores this process may run on"""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except (AttributeError, OSError):
+        return max(1, os.cpu_count() or 1)
+
+
+def useful_threads(height):
+    """Encoder threads worth giving a job of the given frame height"""
+    if not height:
+        height = 1080
+    for max_height, threads in RESOLUTION_THREADS:
+        if height <= max_height:
+            return threads
+    return MAX_USEFUL_THREADS
+
+
+class ThreadPlan:
+    """How the available cores are split between batch workers and ffmpeg threads"""
+
+    def __init__(self, cores, workers):
+        self.cores = cores
+        self.workers = workers
+
+    def threads_per_job(self, info=None):
+        """ffmpeg thread count for one job so all workers together fill the cores once"""
+        share = max(1, self.cores // self.workers)
+        height = None
+        if info and info.get("video"):
+            height = info["video"][0].get("height")
+        return max(1, min(share, useful_threads(height)))
+
+    def thread_args(self, info=None):
+        """Decoder and encoder thread arguments; decoder ones go before -i"""
+        threads = str(self.threads_per_job(info))
+        return ['-threads', threads], ['-threads', threads]
+
+
+def plan_threads(infos, workers=None, cores=None):
+    """Build a ThreadPlan for a batch
+
+    With workers=None the worker count is chosen automatically from the
+    cores and the typical resolution of the batch: each worker gets as many
+    threads as a job of that resolution can use and the rest of the cores
+    go to additional workers. infos=None means the batch is not known yet
+    and plans for typical files.
+    """
+    cores = cores or available_cores()
+    if workers is None:
+        heights = [info["video"][0].get("height") for info in infos or [] if info and info.get("video")]
+        heights = [height for height in heights if height]
+        typical = statistics.median(heights) if heights else None
+        workers = max(1, cores // useful_threads(typical))
+        workers = min(workers, MAX_AUTO_WORKERS, max(1, len(infos)) if infos is not None else MAX_AUTO_WORKERS)
+    return ThreadPlan(cores, max(1, workers))
@@ -0,0 +1,37 @@
+import queue
+
+# Interval for applying results reported by worker threads to the UI
+UI_REFRESH_MS = 100
+
+
+class UIQueueMixin:
+    """Hands calls from worker threads to the Tk thread
+
+    Mixed into the converter tabs, which create self.ui_queue and set
+    self.converting while a batch runs. Worker threads never touch Tk
+    widgets; they queue calls with call_in_ui() and process_ui_queue()
+    runs them every UI_REFRESH_MS on the Tk thread.
+    """
+
+    def call_in_ui(self, func, *args):
+        """Schedule a call on the Tk thread; safe to use from any thread"""
+        self.ui_queue.put((func, args))
+
+    def start_ui_queue(self):
+        """Start processing queued calls; it stops once self.converting is cleared"""
+        self.after(UI_REFRESH_MS, self.process_ui_queue)
+
+    def process_ui_queue(self):
+        """Run all pending UI calls and refresh progress, rescheduling while a batch runs"""
+        while True:
+            try:
+                func, args = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            func(*args)
+        self.refresh_progress()
+        if self.converting:
+            self.after(UI_REFRESH_MS, self.process_ui_queue)
+
+    def refresh_progress(self):
+        """Update progress widgets after the queued calls; tabs without progress display keep this no-op"""
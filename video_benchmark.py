@@ -0,0 +1,295 @@
+"""Measure video conversion throughput on synthetic media
+
+Generates test clips with FFmpeg's testsrc and sine sources, converts them
+with batch_convert under every combination of mode, worker count and
+encoding profile, and writes files/second, realtime factor, CPU
+utilization and peak RSS per run to a JSON report. A previous report can
+be passed with --compare to see the change per configuration.
+
+With --stub, FFmpeg and FFprobe are replaced by small scripts that only
+write placeholder outputs, so the scheduling and bookkeeping overhead of
+the engine is measured on its own (needs a POSIX system).
+
+Examples:
+    python video_benchmark.py --workers 1,4 --profiles fast,balanced --output before.json
+    python video_benchmark.py --workers 1,4 --profiles fast,balanced --compare before.json
+    python video_benchmark.py --stub --files 200 --workers 1,8 --modes transcode,segment
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import video_engine
+from encoding_profiles import PROFILES_FILE
+
+BATCH_CONVERT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "batch_convert.py")
+
+# Test clips as (seconds, size, video codec); the container follows from the codec
+DEFAULT_SPECS = ["10:640x360:h264", "30:1280x720:mpeg2video", "180:1280x720:mpeg2video", "20:1920x1080:mpeg4"]
+
+# Encoders and container for each test clip codec
+CODEC_SETTINGS = {
+    "h264": {"video": "libx264", "audio": "aac", "audio_codec": "aac", "container": "mp4"},
+    "mpeg2video": {"video": "mpeg2video", "audio": "mp2", "audio_codec": "mp2", "container": "mkv"},
+    "mpeg4": {"video": "mpeg4", "audio": "libmp3lame", "audio_codec": "mp3", "container": "avi"},
+}
+
+# batch_convert arguments of each benchmark mode
+MODES = {
+    "remux": ["--format", "mkv"],
+    "transcode": ["--format", "mp4"],
+    "segment": ["--format", "mp4", "--segment-long", "--segment-min-minutes", "2"],
+    "ladder": ["--format", "mp4", "--ladder", "720,360"],
+}
+
+STUB_FFMPEG = r'''
+import os, re, sys, math, time
+args = sys.argv[1:]
+if "-version" in args:
+    print("ffmpeg version benchmark-stub")
+    sys.exit(0)
+delay = float(os.environ.get("BENCHMARK_STUB_DELAY", "0"))
+match = re.search(r"_(\d+)s_", " ".join(args))
+duration = int(match.group(1)) if match else 10
+if "-progress" in args:
+    for step in range(1, 5):
+        time.sleep(delay / 4)
+        print(f"out_time_us={duration * step * 250000}\nfps=250\nspeed=10x", flush=True)
+        print("progress=" + ("end" if step == 4 else "continue"), flush=True)
+if "segment" in args:
+    segment_time = float(args[args.index("-segment_time") + 1])
+    for index in range(max(1, math.ceil(duration / segment_time))):
+        open(args[-1] % index, "wb").close()
+    sys.exit(0)
+for output in [args[-1]] + [arg for arg in args[:-1] if ".partial." in arg]:
+    with open(output, "wb") as f:
+        f.write(b"stub")
+'''
+
+STUB_FFPROBE = r'''
+import re, sys, json
+match = re.search(r"_(\d+)s_(\d+)x(\d+)_(\w+?)\.\w+$", sys.argv[-1])
+if not match:
+    sys.exit(1)
+duration, width, height, codec = match.groups()
+audio = {"h264": "aac", "mpeg2video": "mp2", "mpeg4": "mp3"}.get(codec, "aac")
+print(json.dumps({"format": {"duration": duration, "format_name": "stub"}, "streams": [
+    {"codec_type": "video", "codec_name": codec, "width": int(width), "height": int(height)},
+    {"codec_type": "audio", "codec_name": audio}]}))
+'''
+
+
+def parse_spec(text):
+    """Parse a clip spec like "30:1280x720:mpeg2video" into a dict"""
+    try:
+        seconds, size, codec = text.split(":")
+        width, height = (int(value) for value in size.lower().split("x"))
+        seconds = int(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected SECONDS:WIDTHxHEIGHT:CODEC, got {text}")
+    if codec not in CODEC_SETTINGS:
+        raise argparse.ArgumentTypeError(f"codec must be one of {', '.join(CODEC_SETTINGS)}")
+    return {"seconds": seconds, "width": width, "height": height, "codec": codec}
+
+
+def list_arg(value):
+    return [part for part in value.split(",") if part]
+
+
+def write_stubs(folder):
+    """Write stub ffmpeg and ffprobe scripts; returns the stub ffmpeg path"""
+    os.makedirs(folder)
+    for name, source in (("ffmpeg", STUB_FFMPEG), ("ffprobe", STUB_FFPROBE)):
+        path = os.path.join(folder, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"#!{sys.executable}\n{source}")
+        os.chmod(path, 0o755)
+    return os.path.join(folder, "ffmpeg")
+
+
+def make_inputs(ffmpeg_path, folder, specs, copies, stub):
+    """Create copies test clips per spec; returns the total source duration in seconds"""
+    os.makedirs(folder)
+    total_seconds = 0
+    for spec_index, spec in enumerate(specs):
+        settings = CODEC_SETTINGS[spec["codec"]]
+        size = f"{spec['width']}x{spec['height']}"
+        name = f"{spec['seconds']}s_{size}_{spec['codec']}.{settings['container']}"
+        source = os.path.join(folder, f"clip_{spec_index:02d}_0000_{name}")
+        if stub:
+            with open(source, "wb") as f:
+                f.write(os.urandom(1024))
+        else:
+            subprocess.run([
+                ffmpeg_path, '-y', '-v', 'error',
+                '-f', 'lavfi', '-i', f"testsrc=duration={spec['seconds']}:size={size}:rate=25",
+                '-f', 'lavfi', '-i', f"sine=frequency=440:duration={spec['seconds']}",
+                '-c:v', settings["video"], '-c:a', settings["audio"], '-shortest', source
+            ], check=True)
+        for index in range(1, copies):
+            shutil.copyfile(source, os.path.join(folder, f"clip_{spec_index:02d}_{index:04d}_{name}"))
+        total_seconds += spec["seconds"] * copies
+    return total_seconds
+
+
+def run_batch(command, cwd, env):
+    """Run one batch_convert process; returns (seconds, CPU seconds, peak RSS bytes, exit code, output)
+
+    CPU time and peak RSS cover the converter and every ffmpeg it ran;
+    they are None where os.wait4 is not available.
+    """
+    log_path = os.path.join(cwd, "batch.log")
+    with open(log_path, "w", encoding="utf-8") as log:
+        start = time.monotonic()
+        process = subprocess.Popen(command, cwd=cwd, env=env, stdin=subprocess.DEVNULL, stdout=log,
+                                   stderr=subprocess.STDOUT)
+        cpu_seconds = peak_rss = None
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(process.pid, 0)
+            # Same as os.waitstatus_to_exitcode, which needs Python 3.9
+            process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+            cpu_seconds = usage.ru_utime + usage.ru_stime
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+            peak_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+        else:
+            process.wait()
+        seconds = time.monotonic() - start
+    with open(log_path, encoding="utf-8", errors="replace") as log:
+        return seconds, cpu_seconds, peak_rss, process.returncode, log.read()
+
+
+def run_config(ffmpeg_path, input_folder, work_dir, mode, workers, profile, source_seconds, env):
+    """Convert the test clips once with fresh caches and return the measurements"""
+    run_dir = tempfile.mkdtemp(prefix=f"{mode}_{workers}_{profile}_", dir=work_dir)
+    # Runs start without journal or caches, but with the user's profiles
+    if os.path.exists(PROFILES_FILE):
+        shutil.copyfile(PROFILES_FILE, os.path.join(run_dir, PROFILES_FILE))
+    command = ([sys.executable, BATCH_CONVERT, "video", os.path.abspath(input_folder), "out",
+                "--workers", str(workers), "--profile", profile, "--ffmpeg", ffmpeg_path] + MODES[mode])
+    seconds, cpu_seconds, peak_rss, exit_code, output = run_batch(command, run_dir, env)
+
+    match = re.search(r"Done: (\d+) succeeded, (\d+) failed", output)
+    if not match:
+        raise RuntimeError(f"{mode} run with {workers} workers did not finish:\n{output[-2000:]}")
+    succeeded, failed = int(match.group(1)), int(match.group(2))
+    # batch_convert exits with 1 when files failed; any other non-zero status means the run itself failed
+    ok = exit_code == 0 or (exit_code == 1 and failed)
+    shutil.rmtree(run_dir, ignore_errors=True)
+    cores = os.cpu_count() or 1
+    return {
+        "mode": mode,
+        "workers": workers,
+        "profile": profile,
+        "succeeded": succeeded,
+        "failed": failed,
+        "exit_code": exit_code,
+        "seconds": round(seconds, 3),
+        "files_per_second": round(succeeded / seconds, 3) if seconds and ok else None,
+        "realtime_factor": round(source_seconds / seconds, 2) if seconds and ok and not failed else None,
+        "cpu_seconds": round(cpu_seconds, 3) if cpu_seconds is not None else None,
+        "cpu_utilization": round(cpu_seconds / (seconds * cores), 3) if cpu_seconds is not None and seconds else None,
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 1) if peak_rss is not None else None,
+    }
+
+
+def config_key(run):
+    return run["mode"], run["workers"], run["profile"]
+
+
+def print_run(run, previous=None):
+    line = (f"  {run['mode']:<10} {run['workers']:>3} workers  {run['profile']:<12} "
+            f"{run['files_per_second'] or 0:8.2f} files/s  {run['realtime_factor'] or 0:7.2f}x realtime")
+    if run["cpu_utilization"] is not None:
+        line += f"  CPU {run['cpu_utilization'] * 100:5.1f}%  RSS {run['peak_rss_mb']:7.1f} MB"
+    if run["failed"]:
+        line += f"  ({run['failed']} failed)"
+    if run.get("exit_code"):
+        line += f"  (exit code {run['exit_code']})"
+    if previous and previous.get("files_per_second") and run["files_per_second"]:
+        change = run["files_per_second"] / previous["files_per_second"] - 1
+        line += f"  {change * 100:+.1f}% vs previous"
+    print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark video conversion on synthetic media.")
+    parser.add_argument("--spec", dest="specs", action="append", type=parse_spec, metavar="SECONDS:WxH:CODEC",
+                        help=f"test clip (repeatable; default: {' '.join(DEFAULT_SPECS)}); "
+                             f"codecs: {', '.join(CODEC_SETTINGS)}")
+    parser.add_argument("--files", type=int, default=2, help="copies of every test clip (default: 2)")
+    parser.add_argument("--modes", type=list_arg, default=["remux", "transcode"],
+                        help=f"comma-separated modes out of {', '.join(MODES)} (default: remux,transcode)")
+    parser.add_argument("--workers", type=list_arg, default=["1", "4"],
+                        help="comma-separated worker counts (default: 1,4)")
+    parser.add_argument("--profiles", type=list_arg, default=["fast"],
+                        help="comma-separated encoding profiles (default: fast)")
+    parser.add_argument("--stub", action="store_true", help="use stub ffmpeg/ffprobe to measure engine overhead")
+    parser.add_argument("--stub-delay", type=float, default=0.0,
+                        help="seconds every stub ffmpeg call takes (default: 0)")
+    parser.add_argument("--ffmpeg", help="path to ffmpeg (default: bin directory, then PATH)")
+    parser.add_argument("--output", default="benchmark_report.json", help="JSON report (default: benchmark_report.json)")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    unknown_modes = [mode for mode in args.modes if mode not in MODES]
+    if unknown_modes:
+        parser.error(f"unknown mode: {', '.join(unknown_modes)}")
+    specs = args.specs or [parse_spec(spec) for spec in DEFAULT_SPECS]
+    previous = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = {config_key(run): run for run in json.load(f)["runs"]}
+
+    work_dir = tempfile.mkdtemp(prefix="video_benchmark_")
+    env = dict(os.environ, BENCHMARK_STUB_DELAY=str(args.stub_delay))
+    try:
+        if args.stub:
+            ffmpeg_path = write_stubs(os.path.join(work_dir, "stub"))
+        else:
+            ffmpeg_path = args.ffmpeg or video_engine.find_ffmpeg()
+            if not ffmpeg_path:
+                print("FFmpeg not found; use --ffmpeg or put it on PATH", file=sys.stderr)
+                return 2
+        version = subprocess.run([ffmpeg_path, '-version'], stdout=subprocess.PIPE,
+                                 universal_newlines=True).stdout.splitlines()[0]
+
+        input_folder = os.path.join(work_dir, "input")
+        source_seconds = make_inputs(ffmpeg_path, input_folder, specs, args.files, args.stub)
+        print(f"{len(specs) * args.files} clips, {source_seconds} s of video ({version})")
+
+        runs = []
+        for mode in args.modes:
+            # Stream copies do not depend on the encoding profile
+            profiles = args.profiles[:1] if mode == "remux" else args.profiles
+            for profile in profiles:
+                for workers in args.workers:
+                    run = run_config(ffmpeg_path, input_folder, work_dir, mode, int(workers), profile,
+                                     source_seconds, env)
+                    print_run(run, previous.get(config_key(run)))
+                    runs.append(run)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cores": os.cpu_count()},
+        "ffmpeg": version,
+        "stub": args.stub,
+        "clips": specs,
+        "copies": args.files,
+        "runs": runs,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
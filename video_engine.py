@@ -0,0 +1,915 @@
+import os
+import queue
+import shutil
+import itertools
+import threading
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from media_probe import find_ffprobe, plan_codec_args
+from probe_cache import ProbeCache
+from file_scanner import DirectorySnapshot, nested_folder_pattern, scan_files, suffix_set
+from output_plan import OutputPlanner
+from encoding_ladder import build_ladder_command, ladder_video_args, rendition_path
+from encoding_profiles import DEFAULT_PROFILE, load_profiles, profile_args
+from content_dedup import DuplicateFinder, link_or_copy, same_file_contents
+from loudness import cache_kind, loudnorm_filter, measure_loudness
+import crf_search
+from watch_folder import DEFAULT_POLL_INTERVAL, DEFAULT_STABLE_SECONDS, StabilityTracker, watch_files
+from job_journal import (JobJournal, RUNNING, DONE, FAILED, PENDING, PARTIAL_PATTERNS, fingerprint, partial_path,
+                         commit_output)
+from segment_encoder import WORK_DIR_PATTERNS, SegmentedEncode, plan_segment_count
+from thread_budget import MAX_AUTO_WORKERS, available_cores, plan_threads
+from concurrency_control import SAMPLE_INTERVAL, ConcurrencyController
+from ffmpeg_runner import DEFAULT_STALL_TIMEOUT, FFmpegCancelled, JobControl, run_ffmpeg
+from progress_tracker import ProgressTracker
+from job_scheduler import (ORDER_LONGEST_FIRST, ORDER_DISCOVERY, estimate_cost, fill_missing_costs, order_jobs,
+                           predict_makespan, cost_to_seconds, format_duration)
+
+# English log messages; the GUI passes its translated dictionary instead
+MESSAGES = {
+    "conversion_start": "Searching for video files...",
+    "conversion_start_log": "Starting to scan video files...",
+    "no_video_files": "No video files found",
+    "no_video_files_msg": "No video files found in directory: {}",
+    "video_files_found": "Found {} video files",
+    "using_threads": "Using {} threads for conversion",
+    "thread_budget": "Thread budget: {} cores, {} parallel jobs, up to {} ffmpeg threads per job",
+    "target_format": "Target Format: {}",
+    "output_directory": "Output Directory: {}",
+    "predicted_makespan": "Predicted total time: {} with {} threads",
+    "converting": "Converting...",
+    "file_conversion_start": "Starting conversion: {}",
+    "file_conversion_success": "Success: {}",
+    "file_conversion_error": "Error: Error processing {} - {}",
+    "file_conversion_skip": "Skipping: {} already exists",
+    "unknown_error": "Unknown error: An exception occurred while converting {} - {}",
+    "file_stream_copy": "Stream copy (no re-encoding): {}",
+    "file_partial_copy": "Copying compatible streams, re-encoding the rest: {}",
+    "file_segmented": "Split {} into {} segments for parallel encoding",
+    "file_conversion_redo": "Re-converting {}: the previous run did not finish it with the current source and settings",
+    "file_output_renamed": "Output name of {} is already taken by another file; writing {} instead",
+    "watch_start": "Watching {} for new video files",
+    "file_ladder": "Encoding {} in {} renditions from a single decode",
+    "encoding_profile": "Encoding profile: {} ({})",
+    "duplicates_found": "{} files are identical to another file; they reuse its output instead of being converted",
+    "file_duplicate": "Identical to {}: reused its output for {}",
+    "duplicate_source_failed": "the identical file {} could not be converted",
+    "loudness_analysis": "Measuring loudness of {} files ahead of encoding",
+    "adaptive_workers": "Adapting parallel jobs between {} and {} to system load",
+    "workers_adjusted": "Parallel jobs: {} ({})",
+    "adapt_memory": "memory is short",
+    "adapt_io": "disk I/O is saturated",
+    "adapt_throughput": "the last added job did not raise throughput",
+    "adapt_headroom": "CPU has headroom",
+    "crf_search": "Searching for the CRF of {} from sample encodes",
+    "crf_selected": "CRF {} for {} ({} {:.4g}, {} values tried)",
+    "crf_search_failed": "CRF search failed for {}, keeping the profile's CRF: {}",
+    "batch_cancelling": "Cancelling: stopping running jobs and skipping queued files",
+    "batch_cancelled": "Batch cancelled",
+    "file_cancelled": "Cancelled: {}",
+    "ffprobe_missing": "ffprobe not found next to ffmpeg or on PATH; reading stream information from ffmpeg's input listing instead",
+}
+
+VIDEO_EXTENSIONS = ['.mp4', '.mkv', '.avi', '.mov', '.flv', '.wmv']
+VIDEO_SUFFIXES = suffix_set(VIDEO_EXTENSIONS)
+
+OUTPUT_FORMATS = ["mp4", "mkv", "avi", "mov", "flv", "wmv"]
+
+
+def default_options():
+    """Options understood by VideoConversionEngine, with the GUI defaults"""
+    return {
+        "input_folder": "",
+        "output_folder": "",
+        "target_format": "mp4",
+        "include_subfolders": True,
+        "overwrite_existing": False,
+        "thread_count": 4,
+        "auto_threads": False,
+        # Grow and shrink the number of running jobs with throughput and system pressure
+        "adaptive_workers": False,
+        # Upper bound for adaptive_workers; None uses thread_budget.MAX_AUTO_WORKERS
+        "max_workers": None,
+        "job_order": ORDER_LONGEST_FIRST,
+        "segment_long_videos": False,
+        "segment_min_seconds": 600,
+        "include_patterns": [],
+        "exclude_patterns": [],
+        "scan_snapshot": True,
+        # Seconds one ffmpeg run may take, and may go without its output position advancing; None for no limit
+        "job_timeout": None,
+        "stall_timeout": DEFAULT_STALL_TIMEOUT,
+        # Name of the encoding profile used for streams that need re-encoding
+        "profile": DEFAULT_PROFILE,
+        # Convert byte-identical inputs once and link or copy the output for the others
+        "deduplicate": False,
+        # Loudness target such as loudness.DEFAULT_TARGET for two-pass loudnorm; None leaves audio levels alone
+        "loudness_target": None,
+        # Quality such as crf_search.DEFAULT_QUALITY_TARGET that sampled encodes pick each file's CRF for;
+        # None keeps the profile's CRF
+        "quality_target": None,
+        # Encoding ladder, e.g. [{"name": "720p", "height": 720}]; empty for a single output
+        "renditions": [],
+    }
+
+
+def find_ffmpeg():
+    """Locate ffmpeg in the bundled bin directory, falling back to PATH"""
+    bin_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bin")
+    for name in ("ffmpeg.exe", "ffmpeg"):
+        candidate = os.path.join(bin_dir, name)
+        if os.path.isfile(candidate) and (os.name == "nt" or not name.endswith(".exe")):
+            return candidate
+    return shutil.which("ffmpeg")
+
+
+def find_video_files(folder, include_subfolders):
+    """Find all video files in the given folder"""
+    return list(scan_files(folder, VIDEO_SUFFIXES, include_subfolders))
+
+
+class VideoConversionEngine:
+    """Batch video converter without any GUI dependency
+
+    options is a dict as returned by default_options(). The callbacks are
+    invoked from background threads: log(message) for log lines,
+    on_status(text) for the overall state, on_total(count) once the scan
+    is done and on_result(success) for every finished file.
+    """
+
+    def __init__(self, ffmpeg_path, options, messages=None, log=print,
+                 on_status=None, on_total=None, on_result=None):
+        self.ffmpeg_path = ffmpeg_path
+        self.options = options
+        self.messages = messages or MESSAGES
+        self.log = log
+        self.on_status = on_status or (lambda text: None)
+        self.on_total = on_total or (lambda count: None)
+        self.on_result = on_result or (lambda success: None)
+        self.progress = ProgressTracker()
+        self.control = JobControl(options["job_timeout"], options["stall_timeout"])
+        # StabilityTracker of a running watch(), told when each file's job is done
+        self.watch_tracker = None
+
+    def cancel(self):
+        """Stop the batch; safe to call from any thread
+
+        Running ffmpeg processes are terminated with their children and
+        files still queued are counted as failed without being converted.
+        """
+        if not self.control.cancelled:
+            self.control.cancel()
+            self.log(self.messages["batch_cancelling"])
+
+    def run(self):
+        """Convert the whole batch; blocks until done and returns (succeeded, failed)
+
+        In discovery order files are queued while the scan is still running,
+        so encoding starts right away; the other orders need the whole list
+        to schedule it.
+        """
+        options = self.options
+        messages = self.messages
+        input_folder = options["input_folder"]
+
+        self.on_status(messages["conversion_start"])
+        self.log(messages["conversion_start_log"])
+
+        self.open_state()
+        # Rescans only read directories that changed since the last scan
+        snapshot = DirectorySnapshot() if options["scan_snapshot"] else None
+        try:
+            found = self.drop_own_outputs(scan_files(input_folder, self.source_suffixes(), options["include_subfolders"],
+                                                     options["include_patterns"], self.exclude_patterns(), snapshot))
+            if options["job_order"] == ORDER_DISCOVERY:
+                # Nothing is known about the batch yet, so threads are planned for typical files
+                self.thread_plan = self.plan_thread_budget(None)
+                self.log_plan()
+                succeeded, total = self.convert_files(found, streaming=True)
+            else:
+                video_files = list(found)
+                self.on_total(len(video_files))
+                if video_files:
+                    self.log(messages["video_files_found"].format(len(video_files)))
+                    video_files = self.prepare_batch(video_files)
+                succeeded, total = self.convert_files(video_files)
+        finally:
+            if snapshot is not None:
+                snapshot.close()
+            self.close_state()
+
+        if not total:
+            self.on_status(messages["no_video_files"])
+            self.log(messages["no_video_files_msg"].format(input_folder))
+        return succeeded, total - succeeded
+
+    def watch(self, stop_event, stable_seconds=DEFAULT_STABLE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL):
+        """Convert files as they arrive in the input folder until stop_event is set
+
+        Files are queued once their size has stopped changing for
+        stable_seconds, and the worker pool stays up between arrivals.
+        Outputs the job journal records as done are never converted again,
+        also across restarts, so overwrite_existing is ignored here.
+        Returns (succeeded, failed) once stopped and the queued files are done.
+        """
+        options = self.options
+        self.options = dict(options, overwrite_existing=False)
+        self.log(self.messages["watch_start"].format(options["input_folder"]))
+        self.open_state()
+        try:
+            self.thread_plan = self.plan_thread_budget(None)
+            self.log_plan()
+            # Files changed while their job runs are held back until report() finishes them
+            self.watch_tracker = StabilityTracker(stable_seconds)
+            found = watch_files(options["input_folder"], self.source_suffixes(), stop_event, options["include_subfolders"],
+                                options["include_patterns"], self.exclude_patterns(), stable_seconds, poll_interval,
+                                self.watch_tracker)
+            succeeded, total = self.convert_files(self.drop_own_outputs(found), streaming=True)
+        finally:
+            self.watch_tracker = None
+            self.close_state()
+            self.options = options
+        return succeeded, total - succeeded
+
+    def source_suffixes(self):
+        """Suffixes of the files this engine converts"""
+        return VIDEO_SUFFIXES
+
+    def output_extension(self):
+        """Extension of the converted files"""
+        return self.options["target_format"]
+
+    def prepare_codecs(self):
+        """Resolve the encoding profile into the arguments used for re-encoded streams"""
+        profiles = load_profiles()
+        if self.options["profile"] not in profiles:
+            raise ValueError(f"Unknown encoding profile: {self.options['profile']}")
+        # Arguments for streams that cannot be copied; they are part of the journal
+        # settings, so switching profiles re-encodes outputs made with another one
+        self.transcode_args = profile_args(profiles[self.options["profile"]], self.options["target_format"])
+        self.log(self.messages["encoding_profile"].format(self.options["profile"],
+                                                          " ".join(sum(self.transcode_args, []))))
+
+    def plan_args(self, info):
+        """(video_args, audio_args, mode) for a probed source, see media_probe.plan_codec_args"""
+        return plan_codec_args(info, self.options["target_format"], self.transcode_args)
+
+    def skip_reason(self, video_file, info):
+        """Log message if a probed source has nothing to convert, else None"""
+        return None
+
+    def job_cost(self, info, mode):
+        """Estimated work of converting a source, or None if unknown"""
+        return estimate_cost(info, mode)
+
+    def audio_encoder_args(self):
+        """Arguments for audio that has to be re-encoded, e.g. to normalize its loudness"""
+        return list(self.transcode_args[1])
+
+    def plan_thread_budget(self, infos):
+        """Split the cores between workers and ffmpeg threads; infos=None before the batch is known"""
+        return plan_threads(infos, None if self.options["auto_threads"] else self.options["thread_count"])
+
+    def open_state(self):
+        """Open the caches and per-batch bookkeeping shared by run() and watch()"""
+        self.prepare_codecs()
+        # Probe results are reused across runs for unchanged files
+        self.probe_cache = ProbeCache()
+        # Without ffprobe (the bundled build only ships ffmpeg) streams are read from ffmpeg's input listing
+        self.ffprobe_path = find_ffprobe(self.ffmpeg_path)
+        if not self.ffprobe_path:
+            self.log(self.messages["ffprobe_missing"])
+        # Outputs finished by an earlier, interrupted run are not converted again
+        self.journal = JobJournal()
+        self.job_weights = {}
+        self.dedup = DuplicateFinder() if self.options["deduplicate"] else None
+        # Source file -> (fingerprint, identical earlier file or None); a changed file is compared again
+        self.duplicate_of = {}
+        # Duplicates wait here until their source file is finished
+        self.duplicate_lock = threading.Lock()
+        self.waiting_duplicates = {}
+        self.finished_sources = {}
+        # First loudnorm passes run in their own pool ahead of the encodes that need them
+        self.loudness_futures = {}
+        # Created with the first analysis, once the thread plan is known
+        self.analysis_pool = None
+        self.planner = OutputPlanner(self.options["input_folder"], self.options["output_folder"],
+                                     self.output_extension(), self.earlier_output)
+
+    def close_state(self):
+        if self.analysis_pool is not None:
+            self.analysis_pool.shutdown()
+        self.probe_cache.close()
+        self.journal.close()
+
+    def prepare_batch(self, video_files):
+        """Probe, weight and order a complete file list"""
+        options = self.options
+        # Every output is named and every directory created before any encoding starts
+        self.planner.reserve_inputs(video_files)
+        for video_file in video_files:
+            self.plan_output(video_file)
+        self.planner.create_directories()
+        self.journal.add_pending([(video_file, output_file) for video_file in video_files
+                                  for output_file in self.output_files(video_file)])
+
+        # Identical copies are not probed or scheduled; they run last and only reuse outputs
+        duplicates = [video_file for video_file in video_files if self.duplicate_source(video_file)]
+        if duplicates:
+            self.log(self.messages["duplicates_found"].format(len(duplicates)))
+            video_files = [video_file for video_file in video_files if not self.duplicate_source(video_file)]
+        infos = self.probe_files(video_files)
+
+        # Progress is weighted by duration; files of unknown length count as a typical one
+        durations = fill_missing_costs([info["duration"] if info else None for info in infos])
+        self.job_weights = dict(zip(video_files, durations))
+        self.job_weights.update(dict.fromkeys(duplicates, 0.0))
+        self.progress.add_weight(sum(durations))
+
+        # Split the cores between workers and ffmpeg threads so they are not oversubscribed
+        self.thread_plan = self.plan_thread_budget(infos)
+        self.log_plan()
+
+        # Order jobs by estimated cost so a huge file does not start last
+        ordered = self.schedule_files(video_files, infos, self.thread_plan.workers, options["job_order"])
+        if options["loudness_target"]:
+            # Analysis follows the encode order so the first jobs get their measurements first
+            info_by_file = dict(zip(video_files, infos))
+            for video_file in ordered:
+                self.start_analysis(video_file, info_by_file[video_file])
+            self.log(self.messages["loudness_analysis"].format(len(self.loudness_futures)))
+        return ordered + duplicates
+
+    def add_streamed_file(self, video_file, count):
+        """Register a file found while the batch is already running"""
+        self.plan_output(video_file)
+        self.planner.create_directories()
+        self.journal.add_pending([(video_file, output_file) for output_file in self.output_files(video_file)])
+        if self.duplicate_source(video_file):
+            self.job_weights[video_file] = 0.0
+            self.on_total(count)
+            return
+        info = self.probe_cache.probe(video_file, self.ffprobe_path, self.ffmpeg_path)
+        if self.options["loudness_target"]:
+            self.start_analysis(video_file, info)
+        weight = info["duration"] if info and info["duration"] else None
+        if weight is None:
+            # Files of unknown length count as an average one of those seen so far
+            weight = self.progress.total_weight / (count - 1) if count > 1 else 0.0
+        self.job_weights[video_file] = weight
+        self.progress.add_weight(weight)
+        self.on_total(count)
+
+    def log_plan(self):
+        messages = self.messages
+        self.log(messages["using_threads"].format(self.thread_plan.workers))
+        self.log(messages["thread_budget"].format(
+            self.thread_plan.cores, self.thread_plan.workers, self.thread_plan.threads_per_job()))
+        self.log(messages["target_format"].format(self.options["target_format"].upper()))
+        self.log(messages["output_directory"].format(self.options["output_folder"]))
+
+    def convert_files(self, video_files, streaming=False):
+        """Run the worker pool over video_files; returns (succeeded, number of files)
+
+        With streaming, video_files may be a generator that is consumed
+        while workers are already converting.
+        """
+        if not streaming and not video_files:
+            return 0, 0
+        self.concurrency = self.plan_concurrency()
+        thread_count = self.concurrency.max_workers
+
+        # Create task queue; segment tasks of split videos go ahead of whole files
+        task_queue = queue.PriorityQueue()
+        self.task_queue = task_queue
+        self.task_counter = itertools.count()
+
+        # Create result queue
+        result_queue = queue.Queue()
+
+        # Start worker threads
+        self.on_status(self.messages["converting"])
+
+        succeeded = 0
+        received = 0
+        count = 0
+        stop_adapting = threading.Event()
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            for _ in range(thread_count):
+                executor.submit(self.worker_thread, task_queue, result_queue)
+            if self.concurrency.adaptive:
+                threading.Thread(target=self.adapt_workers, args=(task_queue, stop_adapting), daemon=True).start()
+
+            try:
+                # Add all files to the queue
+                for video_file in video_files:
+                    if self.control.cancelled:
+                        break
+                    # A streaming source yields None while it waits for new files
+                    if video_file is not None:
+                        count += 1
+                        if streaming:
+                            self.add_streamed_file(video_file, count)
+                        source_file = self.duplicate_source(video_file)
+                        if source_file:
+                            self.queue_duplicate(video_file, source_file)
+                        else:
+                            self.put_task(task_queue, 1, ("file", video_file, self.options["input_folder"],
+                                                          self.options["output_folder"]))
+                    # Results are forwarded while the scan continues
+                    while True:
+                        try:
+                            success = result_queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        received += 1
+                        succeeded += 1 if success else 0
+                        self.on_result(success)
+                if streaming and count:
+                    self.log(self.messages["video_files_found"].format(count))
+
+                # Each result is forwarded as soon as a worker reports it
+                for _ in range(count - received):
+                    success = result_queue.get()
+                    succeeded += 1 if success else 0
+                    self.on_result(success)
+            finally:
+                stop_adapting.set()
+                # Workers keep waiting for segment tasks until every file is finished
+                for _ in range(thread_count):
+                    self.put_task(task_queue, 2, None)
+
+        if self.control.cancelled:
+            self.log(self.messages["batch_cancelled"])
+        return succeeded, count
+
+    def plan_concurrency(self):
+        """Controller for the number of running jobs; a fixed limit unless adaptive_workers is set"""
+        workers = self.thread_plan.workers
+        if not self.options["adaptive_workers"]:
+            return ConcurrencyController(workers, workers, workers)
+        max_workers = max(workers, self.options["max_workers"] or MAX_AUTO_WORKERS)
+        self.log(self.messages["adaptive_workers"].format(1, max_workers))
+        return ConcurrencyController(workers, 1, max_workers, self.thread_plan.cores)
+
+    def adapt_workers(self, task_queue, stop_event):
+        """Adjust the running job limit every SAMPLE_INTERVAL seconds until stop_event is set"""
+        last = time.monotonic()
+        while not stop_event.wait(SAMPLE_INTERVAL):
+            now = time.monotonic()
+            change = self.concurrency.update(self.progress.done_weight(), now - last, task_queue.qsize())
+            last = now
+            if change:
+                workers, reason = change
+                # Jobs started from now on split the cores between the new number of workers
+                self.thread_plan.workers = workers
+                self.log(self.messages["workers_adjusted"].format(workers, self.messages["adapt_" + reason]))
+
+    def probe_files(self, video_files):
+        """Probe all files in parallel through the probe cache"""
+        with ThreadPoolExecutor(max_workers=available_cores()) as executor:
+            return list(executor.map(lambda path: self.probe_cache.probe(path, self.ffprobe_path, self.ffmpeg_path),
+                                     video_files))
+
+    def schedule_files(self, video_files, infos, thread_count, job_order):
+        """Order files by estimated cost and log the predicted makespan"""
+        costs = []
+        pieces = []
+        for info in infos:
+            video_args, _, mode = self.plan_args(info)
+            costs.append(self.job_cost(info, mode))
+            # Split videos spread their cost over several workers
+            segment_count = 1
+            segmentable = video_args[1] != 'copy' and info and not self.options["renditions"]
+            if self.options["segment_long_videos"] and segmentable:
+                segment_count = plan_segment_count(info["duration"], thread_count, self.options["segment_min_seconds"])
+            pieces.append(segment_count)
+
+        jobs, costs = order_jobs(list(zip(video_files, pieces)), fill_missing_costs(costs), job_order)
+        piece_costs = []
+        for (_, segment_count), cost in zip(jobs, costs):
+            piece_costs += [cost / segment_count] * segment_count
+        makespan = cost_to_seconds(predict_makespan(piece_costs, thread_count))
+        self.log(self.messages["predicted_makespan"].format(format_duration(makespan), thread_count))
+        return [video_file for video_file, _ in jobs]
+
+    def exclude_patterns(self):
+        """Exclude patterns from the options plus the engine's own files
+
+        Temporary outputs and segment work directories are always excluded,
+        and so are the output and rendition folders where they lie inside
+        the input folder. Outputs written next to their sources are left to
+        drop_own_outputs().
+        """
+        options = self.options
+        patterns = list(options["exclude_patterns"]) + PARTIAL_PATTERNS + WORK_DIR_PATTERNS
+        folders = [options["output_folder"]] + [os.path.join(options["output_folder"], rendition["name"])
+                                                for rendition in options["renditions"]]
+        for folder in folders:
+            pattern = nested_folder_pattern(options["input_folder"], folder)
+            if pattern:
+                patterns.append(pattern)
+        return patterns
+
+    def is_own_output(self, path):
+        """True if path is an output of this batch, or one finished earlier from a source in the input folder
+
+        Journal rows only count if they were converted to the current
+        target format from another file below the current input folder, so
+        outputs of unrelated batches can still be used as sources.
+        """
+        if self.planner.is_output(path):
+            return True
+        if os.path.splitext(path)[1].lower() != "." + self.output_extension().lower():
+            return False
+        entry = self.journal.lookup(path)
+        if entry is None or entry["state"] != DONE or entry["input_path"] == os.path.abspath(path):
+            return False
+        relative = os.path.relpath(entry["input_path"], os.path.abspath(self.options["input_folder"]))
+        return not relative.startswith(os.pardir)
+
+    def earlier_output(self, video_file, path):
+        """True if the journal recorded path as an output of video_file"""
+        entry = self.journal.lookup(path)
+        return entry is not None and entry["input_path"] == os.path.abspath(video_file)
+
+    def drop_own_outputs(self, found):
+        """Skip found files the engine wrote itself, which matters when outputs go into the input folder
+
+        None placeholders of a streaming source are passed through.
+        """
+        for path in found:
+            if path is not None and self.is_own_output(path):
+                # Nothing will be converted, so watch mode may forget it
+                self.release_source(path)
+                continue
+            yield path
+
+    def plan_output(self, video_file):
+        """Assign a source file its output path, renaming it if another file already took that name"""
+        output_file, renamed = self.planner.add(video_file)
+        if renamed:
+            self.log(self.messages["file_output_renamed"].format(video_file, output_file))
+        for rendition_file in self.output_files(video_file):
+            self.planner.add_directory(os.path.dirname(rendition_file))
+
+    def output_path(self, video_file):
+        """Planned output file for a source file"""
+        return self.planner.outputs[video_file]
+
+    def output_files(self, video_file):
+        """Files actually written for a source: the planned output, or one per rendition"""
+        output_file = self.output_path(video_file)
+        renditions = self.options["renditions"]
+        if not renditions:
+            return [output_file]
+        return [rendition_path(self.options["output_folder"], output_file, rendition) for rendition in renditions]
+
+    def output_jobs(self, video_file, video_args, audio_args):
+        """(output file, settings, rendition) for every file written for a source"""
+        renditions = self.options["renditions"]
+        # Loudness measurements and CRF decisions follow from the source and the targets,
+        # so the targets stand in for them
+        targets = [self.options[key] for key in ("loudness_target", "quality_target") if self.options[key]]
+        if not renditions:
+            return [(self.output_path(video_file), [video_args, audio_args] + targets, None)]
+        ladder_args = ladder_video_args(video_args, self.transcode_args[0])
+        return [(output_file, [ladder_args, audio_args, rendition["height"]] + targets, rendition)
+                for output_file, rendition in zip(self.output_files(video_file), renditions)]
+
+    def outputs_current(self, video_file, outputs, quiet=False):
+        """True if all outputs from output_jobs() can be kept; never with overwrite_existing"""
+        if self.options["overwrite_existing"]:
+            return False
+        return all(self.output_is_current(video_file, output_file, settings, quiet)
+                   for output_file, settings, _ in outputs)
+
+    def output_is_current(self, video_file, output_file, settings, quiet=False):
+        """True if an existing output can be kept instead of converting again"""
+        if self.journal.is_done(video_file, output_file, settings):
+            return True
+        if not os.path.exists(output_file):
+            return False
+        # Outputs the journal never started were made outside of it and are trusted as before;
+        # anything it started but did not finish with this input and these settings is redone
+        entry = self.journal.lookup(output_file)
+        if entry is None or entry["state"] == PENDING:
+            return True
+        if not quiet:
+            self.log(self.messages["file_conversion_redo"].format(output_file))
+        return False
+
+    def put_task(self, task_queue, priority, task):
+        """Queue a task; lower priority values are picked up first"""
+        task_queue.put((priority, next(self.task_counter), task))
+
+    def worker_thread(self, task_queue, result_queue):
+        """Worker thread that runs queued file and segment tasks until told to stop"""
+        ffprobe_path = self.ffprobe_path
+        while True:
+            # Only as many workers as the concurrency limit allows take tasks at a time
+            with self.concurrency:
+                _, _, task = task_queue.get()
+                if task is None:
+                    break
+                if task[0] == "segment":
+                    self.encode_segment(task[1], task[2], task[3], result_queue)
+                elif self.control.cancelled:
+                    # Files still queued when the batch is cancelled fail without starting
+                    self.progress.finish(task[1], self.job_weights[task[1]])
+                    self.report(task[1], False, result_queue)
+                elif task[0] == "duplicate":
+                    self.copy_duplicate(task[1], task[2], result_queue)
+                else:
+                    self.convert_file(task[1], task_queue, result_queue, ffprobe_path)
+
+    def convert_file(self, video_file, task_queue, result_queue, ffprobe_path):
+        """Convert a single video file, or hand its segments back to the pool"""
+        messages = self.messages
+        try:
+            self.log(messages["file_conversion_start"].format(video_file))
+
+            # Remux instead of re-encoding when the target container can hold the source streams
+            info = self.probe_cache.probe(video_file, ffprobe_path, self.ffmpeg_path)
+            reason = self.skip_reason(video_file, info)
+            if reason:
+                self.log(reason)
+                self.progress.finish(video_file, self.job_weights[video_file])
+                self.report(video_file, True, result_queue)
+                return
+            video_args, audio_args, mode = self.plan_args(info)
+            outputs = self.output_jobs(video_file, video_args, audio_args)
+
+            if self.outputs_current(video_file, outputs):
+                self.log(messages["file_conversion_skip"].format(", ".join(output[0] for output in outputs)))
+                self.loudness_futures.pop(video_file, None)
+                self.progress.finish(video_file, self.job_weights[video_file])
+                self.report(video_file, True, result_queue)
+                return
+
+            # The second loudnorm pass and the CRF search only change the command;
+            # the journal settings hold their targets
+            if self.options["loudness_target"]:
+                audio_args, mode = self.normalize_audio(video_file, info, video_args, audio_args, mode)
+            if self.options["quality_target"] and '-crf' in video_args:
+                video_args = self.tune_crf(video_file, info, video_args)
+
+            # Outputs are written under a temporary name and renamed once complete,
+            # so a file at the final name is never a partial one
+            for output_file, settings, _ in outputs:
+                self.journal.mark(video_file, output_file, RUNNING, settings)
+
+            # All renditions come from one decode of the source
+            if self.options["renditions"]:
+                self.log(messages["file_ladder"].format(video_file, len(outputs)))
+                command = build_ladder_command(
+                    self.ffmpeg_path, video_file,
+                    [(partial_path(output_file), rendition) for output_file, _, rendition in outputs],
+                    ladder_video_args(video_args, self.transcode_args[0]), audio_args,
+                    self.thread_plan.thread_args(info))
+                self.run_file(video_file, command, outputs)
+                self.report(video_file, True, result_queue)
+                return
+
+            output_file, settings, _ = outputs[0]
+            temp_file = partial_path(output_file)
+            if mode == "copy":
+                self.log(messages["file_stream_copy"].format(video_file))
+            elif mode == "partial":
+                self.log(messages["file_partial_copy"].format(video_file))
+
+            # Long videos that need a video encode are split so idle workers can help
+            if self.options["segment_long_videos"] and video_args[1] != 'copy':
+                duration = info["duration"] if info else None
+                segment_count = plan_segment_count(duration, self.thread_plan.workers, self.options["segment_min_seconds"])
+                if segment_count > 1:
+                    job = SegmentedEncode(self.ffmpeg_path, video_file, temp_file, video_args, audio_args,
+                                          self.thread_plan.thread_args(info), self.control)
+                    try:
+                        segment_count = job.split(segment_count, duration)
+                    except Exception:
+                        job.cleanup()
+                        raise
+                    if segment_count:
+                        self.log(messages["file_segmented"].format(video_file, segment_count))
+                        # Segments jump ahead of files still waiting so this file is not a straggler;
+                        # they carry the planned outputs so the journal records the settings checked above
+                        for index in range(segment_count):
+                            self.put_task(task_queue, 0, ("segment", job, index, outputs))
+                        return
+                    # No segment task would ever finish the file, so it is encoded whole instead
+                    job.cleanup()
+
+            decoder_threads, encoder_threads = [], []
+            if video_args[1] != 'copy':
+                decoder_threads, encoder_threads = self.thread_plan.thread_args(info)
+            command = ([self.ffmpeg_path, '-y'] + decoder_threads + ['-i', video_file] +
+                       video_args + encoder_threads + audio_args + [temp_file])
+            self.run_file(video_file, command, outputs)
+            self.report(video_file, True, result_queue)
+        except FFmpegCancelled:
+            self.fail_output(video_file)
+            self.progress.finish(video_file, self.job_weights[video_file])
+            self.log(messages["file_cancelled"].format(video_file))
+            self.report(video_file, False, result_queue)
+        except (subprocess.SubprocessError, FileNotFoundError) as e:
+            self.fail_output(video_file)
+            self.progress.finish(video_file, self.job_weights[video_file])
+            self.log(messages["file_conversion_error"].format(video_file, str(e)))
+            self.report(video_file, False, result_queue)
+        except Exception as e:
+            self.fail_output(video_file)
+            self.progress.finish(video_file, self.job_weights[video_file])
+            self.log(messages["unknown_error"].format(video_file, str(e)))
+            self.report(video_file, False, result_queue)
+
+    def start_analysis(self, video_file, info):
+        """Queue the first loudnorm pass of a file that has audio and outputs still to convert
+
+        The pool is sized like the worker pool of the thread plan rather
+        than one analysis per core, so it does not crowd out the encodes.
+        """
+        if info is not None and not info["audio"]:
+            return
+        video_args, audio_args, _ = self.plan_args(info)
+        if self.outputs_current(video_file, self.output_jobs(video_file, video_args, audio_args), quiet=True):
+            return
+        if self.analysis_pool is None:
+            self.analysis_pool = ThreadPoolExecutor(max_workers=self.thread_plan.workers)
+        self.loudness_futures[video_file] = self.analysis_pool.submit(self.file_loudness, video_file)
+
+    def file_loudness(self, video_file):
+        """First-pass loudnorm measurements, reused from the probe cache while the file is unchanged
+
+        The measurements only depend on the source and the target, so
+        exports to other formats or bitrates skip the analysis.
+        """
+        target = self.options["loudness_target"]
+        measured = self.probe_cache.get(video_file, cache_kind(target))
+        if measured is None:
+            measured = measure_loudness(self.ffmpeg_path, video_file, target, self.control)
+            self.probe_cache.put(video_file, measured, cache_kind(target))
+        return measured
+
+    def normalize_audio(self, video_file, info, video_args, audio_args, mode):
+        """Audio arguments and mode with the second loudnorm pass; waits for the file's analysis"""
+        future = self.loudness_futures.pop(video_file, None)
+        if future is not None:
+            measured = future.result()
+        elif info is None or info["audio"]:
+            measured = self.file_loudness(video_file)
+        else:
+            return audio_args, mode
+        sample_rate = info["audio"][0].get("sample_rate") if info else None
+        audio_filter = loudnorm_filter(self.options["loudness_target"], measured, sample_rate)
+        if audio_filter is None:
+            return audio_args, mode
+        if audio_args[1:2] == ['copy']:
+            audio_args = self.audio_encoder_args()
+            mode = "partial" if video_args[1:2] == ['copy'] else "transcode"
+        return ['-af', audio_filter] + audio_args, mode
+
+    def tune_crf(self, video_file, info, video_args):
+        """video_args with the CRF picked from sample encodes, reused from the probe cache while the file is unchanged"""
+        if not info or not info.get("duration"):
+            return video_args
+        target = self.options["quality_target"]
+        kind = crf_search.cache_kind(target, video_args)
+        decision = self.probe_cache.get(video_file, kind)
+        if decision is None:
+            self.log(self.messages["crf_search"].format(video_file))
+            try:
+                decision = crf_search.search_crf(self.ffmpeg_path, video_file, info["duration"], video_args, target,
+                                                 self.thread_plan.thread_args(info)[1], self.control)
+            except FFmpegCancelled:
+                raise
+            except (subprocess.SubprocessError, ValueError) as e:
+                self.log(self.messages["crf_search_failed"].format(video_file, str(e)))
+                return video_args
+            self.probe_cache.put(video_file, decision, kind)
+        self.log(self.messages["crf_selected"].format(decision["crf"], video_file, target["metric"].upper(),
+                                                      decision["score"], decision["tried"]))
+        return crf_search.with_crf(video_args, decision["crf"])
+
+    def report(self, video_file, success, result_queue):
+        """Hand in the result of a source file and release the duplicates waiting for it"""
+        self.release_source(video_file)
+        result_queue.put(success)
+        if self.dedup is None:
+            return
+        with self.duplicate_lock:
+            self.finished_sources[video_file] = success
+            waiting = self.waiting_duplicates.pop(video_file, [])
+        for duplicate_file in waiting:
+            self.put_task(self.task_queue, 0, ("duplicate", duplicate_file, video_file))
+
+    def release_source(self, video_file):
+        """Let watch mode queue a newer version of a file whose job is done"""
+        if self.watch_tracker is not None:
+            self.watch_tracker.finish(video_file)
+
+    def duplicate_source(self, video_file):
+        """Earlier file of the batch with the same content as video_file, or None"""
+        if self.dedup is None:
+            return None
+        state = fingerprint(video_file)
+        cached = self.duplicate_of.get(video_file)
+        if cached is None or cached[0] != state:
+            if cached is not None:
+                # Changed since it was compared (watch mode); its hashes and earlier result are stale
+                self.dedup.forget(video_file)
+                with self.duplicate_lock:
+                    self.finished_sources.pop(video_file, None)
+            self.duplicate_of[video_file] = (state, self.dedup.add(video_file))
+        return self.duplicate_of[video_file][1]
+
+    def queue_duplicate(self, video_file, source_file):
+        """Queue a duplicate once its source is finished, or keep it waiting until then"""
+        with self.duplicate_lock:
+            if source_file not in self.finished_sources:
+                self.waiting_duplicates.setdefault(source_file, []).append(video_file)
+                return
+        self.put_task(self.task_queue, 0, ("duplicate", video_file, source_file))
+
+    def copy_duplicate(self, video_file, source_file, result_queue):
+        """Give a duplicate the outputs of its identical source as hard links or copies"""
+        messages = self.messages
+        try:
+            if not self.finished_sources[source_file]:
+                raise RuntimeError(messages["duplicate_source_failed"].format(source_file))
+            for source_output, output_file in zip(self.output_files(source_file), self.output_files(video_file)):
+                if self.options["overwrite_existing"] or not same_file_contents(source_output, output_file):
+                    link_or_copy(source_output, output_file)
+                self.journal.mark(video_file, output_file, DONE, ["duplicate", source_output])
+                self.log(messages["file_duplicate"].format(source_file, output_file))
+            success = True
+        except Exception as e:
+            self.fail_output(video_file)
+            self.log(messages["file_conversion_error"].format(video_file, str(e)))
+            success = False
+        self.progress.finish(video_file, self.job_weights[video_file])
+        self.release_source(video_file)
+        result_queue.put(success)
+
+    def run_file(self, video_file, command, outputs):
+        """Run the ffmpeg command converting a whole file and move its outputs into place"""
+        self.progress.start(video_file, self.job_weights[video_file], os.path.basename(video_file))
+        run_ffmpeg(command, lambda seconds, fps, speed: self.progress.update(video_file, seconds, fps, speed),
+                   self.control)
+        self.finish_outputs(video_file, outputs)
+        self.progress.finish(video_file)
+        for output_file, _, _ in outputs:
+            self.log(self.messages["file_conversion_success"].format(output_file))
+
+    def finish_outputs(self, video_file, outputs):
+        """Move completed outputs into place and record them as done"""
+        for output_file, settings, _ in outputs:
+            commit_output(partial_path(output_file), output_file)
+            self.journal.mark(video_file, output_file, DONE, settings)
+
+    def fail_output(self, video_file):
+        """Discard partial outputs and record the failure"""
+        for output_file in self.output_files(video_file):
+            try:
+                os.remove(partial_path(output_file))
+            except OSError:
+                pass
+            self.journal.mark(video_file, output_file, FAILED)
+
+    def encode_segment(self, job, index, outputs, result_queue):
+        """Encode one segment of a split video; the last segment to finish joins them"""
+        messages = self.messages
+        key = (job.video_file, index)
+        self.progress.start(key, self.job_weights[job.video_file] / len(job.segments),
+                            f"{os.path.basename(job.video_file)} [{index + 1}/{len(job.segments)}]")
+        try:
+            job.encode_segment(index, lambda seconds, fps, speed: self.progress.update(key, seconds, fps, speed))
+            last = job.segment_done(True)
+        except Exception as e:
+            last = job.segment_done(False, e)
+        self.progress.finish(key)
+        if not last:
+            return
+
+        try:
+            if job.failed:
+                raise job.error
+            job.concat()
+            self.finish_outputs(job.video_file, outputs)
+            self.log(messages["file_conversion_success"].format(self.output_path(job.video_file)))
+            self.report(job.video_file, True, result_queue)
+        except FFmpegCancelled:
+            self.fail_output(job.video_file)
+            self.log(messages["file_cancelled"].format(job.video_file))
+            self.report(job.video_file, False, result_queue)
+        except (subprocess.SubprocessError, FileNotFoundError) as e:
+            self.fail_output(job.video_file)
+            self.log(messages["file_conversion_error"].format(job.video_file, str(e)))
+            self.report(job.video_file, False, result_queue)
+        except Exception as e:
+            self.fail_output(job.video_file)
+            self.log(messages["unknown_error"].format(job.video_file, str(e)))
+            self.report(job.video_file, False, result_queue)
+        finally:
+            job.cleanup()
@@ -4,9 +4,16 @@ import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 import threading
 import queue
-import time
 import json
-from concurrent.futures import ThreadPoolExecutor
+from ui_queue import UIQueueMixin
+from progress_tracker import ProgressTracker
+from log_sink import LogSink
+from job_scheduler import ORDER_LONGEST_FIRST, ORDER_SHORTEST_FIRST, ORDER_DISCOVERY, format_duration
+from encoding_ladder import parse_ladder
+from encoding_profiles import DEFAULT_PROFILE, load_profiles
+from loudness import DEFAULT_TARGET
+from crf_search import DEFAULT_QUALITY_TARGET
+from video_engine import VideoConversionEngine, OUTPUT_FORMATS, default_options, find_ffmpeg
 
 # 加载语言文件
 DEFAULT_LANGUAGES = {
@@ -34,7 +41,7 @@ DEFAULT_LANGUAGES = {
     "error_ffmpeg": "Error",
     "error_ffmpeg_msg": "Unable to execute FFmpeg: ",
     "no_video_files": "No video files found",
-    "no_video_files_msg": "No video files found in directory: ",
+    "no_video_files_msg": "No video files found in directory: {}",
     "conversion_start": "Searching for video files...",
     "conversion_start_log": "Starting to scan video files...",
     "video_files_found": "Found {} video files",
@@ -55,6 +62,51 @@ DEFAULT_LANGUAGES = {
     "conversion_finished_title": "Completed",
     "conversion_finished_msg": "Conversion completed!\nSuccess: {}\nFailed: {}",
     "set_output_folder": "Automatically set output folder to: {}",
+    "file_stream_copy": "Stream copy (no re-encoding): {}",
+    "file_partial_copy": "Copying compatible streams, re-encoding the rest: {}",
+    "segment_long_videos": "Split Long Videos",
+    "segment_min_minutes_label": "Min. Length (min):",
+    "file_segmented": "Split {} into {} segments for parallel encoding",
+    "job_order_label": "Job Order:",
+    "order_longest_first": "Longest First",
+    "order_shortest_first": "Shortest First",
+    "order_discovery": "Discovery Order",
+    "predicted_makespan": "Predicted total time: {} with {} threads",
+    "auto_threads": "Auto",
+    "thread_budget": "Thread budget: {} cores, {} parallel jobs, up to {} ffmpeg threads per job",
+    "active_jobs_label": "Active Jobs:",
+    "progress_overall": "{:.1f}% | ETA {}",
+    "active_job": "{} - {:.0f}% - {} fps - {}x - ETA {}",
+    "file_conversion_redo": "Re-converting {}: the previous run did not finish it with the current source and settings",
+    "file_output_renamed": "Output name of {} is already taken by another file; writing {} instead",
+    "watch_start": "Watching {} for new video files",
+    "file_ladder": "Encoding {} in {} renditions from a single decode",
+    "renditions_label": "Renditions:",
+    "error_invalid_renditions": "Invalid renditions, expected heights like 1080,720,480: ",
+    "encoding_profile": "Encoding profile: {} ({})",
+    "profile_label": "Profile:",
+    "duplicates_found": "{} files are identical to another file; they reuse its output instead of being converted",
+    "file_duplicate": "Identical to {}: reused its output for {}",
+    "duplicate_source_failed": "the identical file {} could not be converted",
+    "deduplicate": "Convert identical files once",
+    "loudness_analysis": "Measuring loudness of {} files ahead of encoding",
+    "normalize_loudness": "Normalize loudness (EBU R128)",
+    "adaptive_workers": "Adapting parallel jobs between {} and {} to system load",
+    "workers_adjusted": "Parallel jobs: {} ({})",
+    "adapt_memory": "memory is short",
+    "adapt_io": "disk I/O is saturated",
+    "adapt_throughput": "the last added job did not raise throughput",
+    "adapt_headroom": "CPU has headroom",
+    "adapt_workers_label": "Adapt to system load",
+    "crf_search": "Searching for the CRF of {} from sample encodes",
+    "crf_selected": "CRF {} for {} ({} {:.4g}, {} values tried)",
+    "crf_search_failed": "CRF search failed for {}, keeping the profile's CRF: {}",
+    "auto_crf": "Pick CRF per file from sample encodes",
+    "batch_cancelling": "Cancelling: stopping running jobs and skipping queued files",
+    "batch_cancelled": "Batch cancelled",
+    "file_cancelled": "Cancelled: {}",
+    "stop_button": "Stop",
+    "ffprobe_missing": "ffprobe not found next to ffmpeg or on PATH; reading stream information from ffmpeg's input listing instead",
 }
 
 ZH_CN = DEFAULT_LANGUAGES
@@ -93,7 +145,7 @@ LANGUAGES = {
         "error_ffmpeg": "Error",
         "error_ffmpeg_msg": "Unable to execute FFmpeg: ",
         "no_video_files": "No video files found",
-        "no_video_files_msg": "No video files found in directory: ",
+        "no_video_files_msg": "No video files found in directory: {}",
         "conversion_start": "Searching for video files...",
         "conversion_start_log": "Starting to scan video files...",
         "video_files_found": "Found {} video files",
@@ -114,6 +166,51 @@ LANGUAGES = {
         "conversion_finished_title": "Completed",
         "conversion_finished_msg": "Conversion completed!\nSuccess: {}\nFailed: {}",
         "set_output_folder": "Automatically set output folder to: {}",
+        "file_stream_copy": "Stream copy (no re-encoding): {}",
+        "file_partial_copy": "Copying compatible streams, re-encoding the rest: {}",
+        "segment_long_videos": "Split Long Videos",
+        "segment_min_minutes_label": "Min. Length (min):",
+        "file_segmented": "Split {} into {} segments for parallel encoding",
+        "job_order_label": "Job Order:",
+        "order_longest_first": "Longest First",
+        "order_shortest_first": "Shortest First",
+        "order_discovery": "Discovery Order",
+        "predicted_makespan": "Predicted total time: {} with {} threads",
+        "auto_threads": "Auto",
+        "thread_budget": "Thread budget: {} cores, {} parallel jobs, up to {} ffmpeg threads per job",
+        "active_jobs_label": "Active Jobs:",
+        "progress_overall": "{:.1f}% | ETA {}",
+        "active_job": "{} - {:.0f}% - {} fps - {}x - ETA {}",
+        "file_conversion_redo": "Re-converting {}: the previous run did not finish it with the current source and settings",
+        "file_output_renamed": "Output name of {} is already taken by another file; writing {} instead",
+        "watch_start": "Watching {} for new video files",
+        "file_ladder": "Encoding {} in {} renditions from a single decode",
+        "renditions_label": "Renditions:",
+        "error_invalid_renditions": "Invalid renditions, expected heights like 1080,720,480: ",
+        "encoding_profile": "Encoding profile: {} ({})",
+        "profile_label": "Profile:",
+        "duplicates_found": "{} files are identical to another file; they reuse its output instead of being converted",
+        "file_duplicate": "Identical to {}: reused its output for {}",
+        "duplicate_source_failed": "the identical file {} could not be converted",
+        "deduplicate": "Convert identical files once",
+        "loudness_analysis": "Measuring loudness of {} files ahead of encoding",
+        "normalize_loudness": "Normalize loudness (EBU R128)",
+        "adaptive_workers": "Adapting parallel jobs between {} and {} to system load",
+        "workers_adjusted": "Parallel jobs: {} ({})",
+        "adapt_memory": "memory is short",
+        "adapt_io": "disk I/O is saturated",
+        "adapt_throughput": "the last added job did not raise throughput",
+        "adapt_headroom": "CPU has headroom",
+        "adapt_workers_label": "Adapt to system load",
+        "crf_search": "Searching for the CRF of {} from sample encodes",
+        "crf_selected": "CRF {} for {} ({} {:.4g}, {} values tried)",
+        "crf_search_failed": "CRF search failed for {}, keeping the profile's CRF: {}",
+        "auto_crf": "Pick CRF per file from sample encodes",
+        "batch_cancelling": "Cancelling: stopping running jobs and skipping queued files",
+        "batch_cancelled": "Batch cancelled",
+        "file_cancelled": "Cancelled: {}",
+        "stop_button": "Stop",
+        "ffprobe_missing": "ffprobe not found next to ffmpeg or on PATH; reading stream information from ffmpeg's input listing instead",
     },
 }
 
@@ -139,14 +236,15 @@ def load_language_files():
 
 load_language_files()
 
-class VideoConverterTab(ttk.Frame):
+class VideoConverterTab(UIQueueMixin, ttk.Frame):
     def __init__(self, parent, language):
         super().__init__(parent)
         self.language = language
+        self.log_sink = LogSink("video_converter")
         self.update_ui()
 
     def update_ui(self):
-        """Update UI elements based on current language setting"""
+        """Create the variables and widgets of the tab; a language change only calls create_widgets()"""
         lang = self.language.get()
 
         # Create variables
@@ -155,15 +253,34 @@ class VideoConverterTab(ttk.Frame):
         self.include_subfolders = tk.BooleanVar(value=True)
         self.overwrite_existing = tk.BooleanVar(value=False)
         self.thread_count = tk.IntVar(value=4)
+        self.auto_threads = tk.BooleanVar(value=False)
+        self.adaptive_workers = tk.BooleanVar(value=False)
         self.status = tk.StringVar(value="Ready")
         self.total_files = tk.IntVar(value=0)
         self.processed_files = tk.IntVar(value=0)
         self.successful_files = tk.IntVar(value=0)
         self.failed_files = tk.IntVar(value=0)
         self.target_format = tk.StringVar(value="mp4")
+        self.progress_value = tk.DoubleVar(value=0)
+        self.progress_text = tk.StringVar(value="")
+        self.file_stats = tk.StringVar(value="")
+
+        # Calls queued by worker threads for the Tk thread
+        self.ui_queue = queue.Queue()
+        self.converting = False
+        self.engine = None
+        self.progress = ProgressTracker()
+        self.segment_long_videos = tk.BooleanVar(value=False)
+        self.segment_min_minutes = tk.IntVar(value=10)
+        self.renditions = tk.StringVar(value="")
+        self.profile = tk.StringVar(value=DEFAULT_PROFILE)
+        self.deduplicate = tk.BooleanVar(value=False)
+        self.normalize_loudness = tk.BooleanVar(value=False)
+        self.auto_crf = tk.BooleanVar(value=False)
+        self.job_order = tk.StringVar(value=ORDER_LONGEST_FIRST)
 
         # FFmpeg path (relative)
-        self.ffmpeg_path = os.path.abspath("./bin/ffmpeg.exe")
+        self.ffmpeg_path = find_ffmpeg() or os.path.abspath("./bin/ffmpeg.exe")
 
         # Create the UI on the video tab
         self.create_widgets()
@@ -212,26 +329,65 @@ class VideoConverterTab(ttk.Frame):
         format_combo = ttk.Combobox(
             main_frame,
             textvariable=self.target_format,
-            values=["mp4", "mkv", "avi", "mov", "flv", "wmv"],
+            values=OUTPUT_FORMATS,
             width=10
         )
         format_combo.grid(row=2, column=1, sticky=tk.W, padx=5, pady=5)
         format_combo.set("mp4")  # Default selection
 
+        # Optional encoding ladder, e.g. "1080,720,480"; empty keeps the source resolution
+        ladder_frame = ttk.Frame(main_frame)
+        ladder_frame.grid(row=2, column=1, sticky=tk.E)
+        ttk.Label(ladder_frame, text=LANGUAGES[lang]["renditions_label"]).pack(side=tk.LEFT)
+        ttk.Entry(ladder_frame, textvariable=self.renditions, width=16).pack(side=tk.LEFT, padx=5)
+        # Encoding profiles: built-in ones plus those saved in profiles.json
+        ttk.Label(ladder_frame, text=LANGUAGES[lang]["profile_label"]).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Combobox(ladder_frame, textvariable=self.profile, values=sorted(load_profiles()),
+                     width=12, state="readonly").pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(ladder_frame, text=LANGUAGES[lang]["auto_crf"], variable=self.auto_crf).pack(side=tk.LEFT, padx=5)
+
         # Options
         options_frame = ttk.Frame(main_frame)
         options_frame.grid(row=3, column=0, columnspan=3, sticky=tk.W, pady=5)
 
         ttk.Checkbutton(options_frame, text=LANGUAGES[lang]["include_subfolders"], variable=self.include_subfolders).pack(side=tk.LEFT, padx=10)
         ttk.Checkbutton(options_frame, text=LANGUAGES[lang]["overwrite_existing"], variable=self.overwrite_existing).pack(side=tk.LEFT, padx=10)
+        ttk.Checkbutton(options_frame, text=LANGUAGES[lang]["deduplicate"], variable=self.deduplicate).pack(side=tk.LEFT, padx=10)
+        ttk.Checkbutton(options_frame, text=LANGUAGES[lang]["normalize_loudness"], variable=self.normalize_loudness).pack(side=tk.LEFT, padx=10)
+        ttk.Checkbutton(options_frame, text=LANGUAGES[lang]["segment_long_videos"], variable=self.segment_long_videos).pack(side=tk.LEFT, padx=10)
+        ttk.Label(options_frame, text=LANGUAGES[lang]["segment_min_minutes_label"]).pack(side=tk.LEFT)
+        ttk.Spinbox(options_frame, from_=1, to=600, textvariable=self.segment_min_minutes, width=5).pack(side=tk.LEFT, padx=5)
 
         # Thread count selection
         ttk.Label(main_frame, text=LANGUAGES[lang]["thread_count_label"]).grid(row=4, column=0, sticky=tk.W, pady=5)
-        thread_combo = ttk.Combobox(main_frame, textvariable=self.thread_count, values=[1, 2, 3, 4, 5, 6, 7, 8], width=5)
-        thread_combo.grid(row=4, column=1, sticky=tk.W, padx=5, pady=5)
-
-        # Conversion button with increased width
-        ttk.Button(main_frame, text=LANGUAGES[lang]["start_conversion"], command=self.start_conversion, style='Accent.TButton').grid(row=5, column=0, columnspan=10, pady=20)
+        thread_frame = ttk.Frame(main_frame)
+        thread_frame.grid(row=4, column=1, columnspan=3, sticky=tk.W)
+        thread_combo = ttk.Combobox(thread_frame, textvariable=self.thread_count, values=[1, 2, 3, 4, 5, 6, 7, 8], width=5)
+        thread_combo.pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Checkbutton(thread_frame, text=LANGUAGES[lang]["auto_threads"], variable=self.auto_threads).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(thread_frame, text=LANGUAGES[lang]["adapt_workers_label"], variable=self.adaptive_workers).pack(side=tk.LEFT, padx=5)
+
+        # Job order selection; the combobox shows translated names for the order keys
+        order_names = {
+            ORDER_LONGEST_FIRST: LANGUAGES[lang]["order_longest_first"],
+            ORDER_SHORTEST_FIRST: LANGUAGES[lang]["order_shortest_first"],
+            ORDER_DISCOVERY: LANGUAGES[lang]["order_discovery"],
+        }
+        ttk.Label(thread_frame, text=LANGUAGES[lang]["job_order_label"]).pack(side=tk.LEFT, padx=(20, 0))
+        order_combo = ttk.Combobox(thread_frame, values=list(order_names.values()), width=16, state="readonly")
+        order_combo.pack(side=tk.LEFT, padx=5, pady=5)
+        order_combo.set(order_names[self.job_order.get()])
+        order_combo.bind("<<ComboboxSelected>>",
+                         lambda e: self.job_order.set(list(order_names)[order_combo.current()]))
+
+        # Conversion buttons
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=5, column=0, columnspan=10, pady=20)
+        self.start_button = ttk.Button(button_frame, text=LANGUAGES[lang]["start_conversion"], command=self.start_conversion, style='Accent.TButton')
+        self.start_button.pack(side=tk.LEFT, padx=5)
+        if self.converting:
+            self.start_button.config(state="disabled")
+        ttk.Button(button_frame, text=LANGUAGES[lang]["stop_button"], command=self.cancel_conversion).pack(side=tk.LEFT, padx=5)
 
         # Status information
         ttk.Label(main_frame, text=LANGUAGES[lang]["status_label"]).grid(row=6, column=0, sticky=tk.W, pady=5)
@@ -239,27 +395,31 @@ class VideoConverterTab(ttk.Frame):
 
         # Progress bar
         ttk.Label(main_frame, text=LANGUAGES[lang]["progress_label"]).grid(row=7, column=0, sticky=tk.W, pady=5)
-        progress_var = tk.DoubleVar()
-        progress_bar = ttk.Progressbar(main_frame, variable=progress_var, length=400)
+        progress_bar = ttk.Progressbar(main_frame, variable=self.progress_value, length=400)
         progress_bar.grid(row=7, column=1, padx=5, pady=5)
+        ttk.Label(main_frame, textvariable=self.progress_text).grid(row=7, column=2, columnspan=2, sticky=tk.W, pady=5)
 
         # File count
         ttk.Label(main_frame, text=LANGUAGES[lang]["file_stats_label"]).grid(row=8, column=0, sticky=tk.W, pady=5)
-        ttk.Label(main_frame, textvariable=lambda:
-                  f"Total: {self.total_files.get()} | "
-                  f"Success: {self.successful_files.get()} | "
-                  f"Failed: {self.failed_files.get()}").grid(row=8, column=1, sticky=tk.W, pady=5)
+        ttk.Label(main_frame, textvariable=self.file_stats).grid(row=8, column=1, sticky=tk.W, pady=5)
+        self.update_file_stats()
+
+        # Jobs currently running with their speed and ETA
+        ttk.Label(main_frame, text=LANGUAGES[lang]["active_jobs_label"]).grid(row=9, column=0, sticky=tk.NW, pady=5)
+        self.active_jobs = tk.Listbox(main_frame, width=80, height=4, font=self.font)
+        self.active_jobs.grid(row=9, column=1, columnspan=2, padx=5, pady=5, sticky=tk.EW)
 
         # Log area
-        ttk.Label(main_frame, text=LANGUAGES[lang]["log_label"]).grid(row=9, column=0, sticky=tk.NW, pady=5)
+        ttk.Label(main_frame, text=LANGUAGES[lang]["log_label"]).grid(row=10, column=0, sticky=tk.NW, pady=5)
         self.log_text = tk.Text(main_frame, width=80, height=10, font=self.font)
-        self.log_text.grid(row=9, column=1, columnspan=2, padx=5, pady=5, sticky=tk.NSEW)
+        self.log_text.grid(row=10, column=1, columnspan=2, padx=5, pady=5, sticky=tk.NSEW)
         scrollbar = ttk.Scrollbar(main_frame, command=self.log_text.yview)
-        scrollbar.grid(row=9, column=3, sticky=tk.NS)
+        scrollbar.grid(row=10, column=3, sticky=tk.NS)
         self.log_text.config(yscrollcommand=scrollbar.set)
+        self.log_sink.attach(self.log_text)
 
         # Set weights to make the log area scalable
-        main_frame.grid_rowconfigure(9, weight=1)
+        main_frame.grid_rowconfigure(10, weight=1)
         main_frame.grid_columnconfigure(1, weight=1)
 
     def browse_input_folder(self):
@@ -289,6 +449,8 @@ class VideoConverterTab(ttk.Frame):
 
     def start_conversion(self):
         """Start the video conversion process"""
+        if self.converting:
+            return
         lang = self.language.get()
         # Input validation
         input_folder = self.input_folder.get()
@@ -314,6 +476,13 @@ class VideoConverterTab(ttk.Frame):
                 messagebox.showerror(LANGUAGES[lang]["error_create_output_folder"], LANGUAGES[lang]["error_create_output_folder_msg"] + output_folder + "\n" + str(e))
                 return
 
+        try:
+            renditions = parse_ladder(self.renditions.get())
+        except ValueError:
+            messagebox.showerror(LANGUAGES[lang]["conversion_failed"],
+                                 LANGUAGES[lang]["error_invalid_renditions"] + self.renditions.get())
+            return
+
         # Check FFmpeg availability
         try:
             subprocess.run([self.ffmpeg_path, '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
@@ -326,147 +495,117 @@ class VideoConverterTab(ttk.Frame):
         self.processed_files.set(0)
         self.successful_files.set(0)
         self.failed_files.set(0)
+        self.update_file_stats()
 
         # Clear log
         self.log_text.delete(1.0, tk.END)
 
+        # Worker threads only read this snapshot, never the Tk variables
+        self.options = dict(default_options())
+        self.options.update({
+            "language": lang,
+            "input_folder": input_folder,
+            "output_folder": output_folder,
+            "target_format": self.target_format.get(),
+            "include_subfolders": self.include_subfolders.get(),
+            "overwrite_existing": self.overwrite_existing.get(),
+            "thread_count": self.thread_count.get(),
+            "auto_threads": self.auto_threads.get(),
+            "adaptive_workers": self.adaptive_workers.get(),
+            "job_order": self.job_order.get(),
+            "segment_long_videos": self.segment_long_videos.get(),
+            "segment_min_seconds": self.segment_min_minutes.get() * 60,
+            "renditions": renditions,
+            "profile": self.profile.get(),
+            "deduplicate": self.deduplicate.get(),
+            "loudness_target": DEFAULT_TARGET if self.normalize_loudness.get() else None,
+            "quality_target": DEFAULT_QUALITY_TARGET if self.auto_crf.get() else None,
+        })
+        self.progress = ProgressTracker()
+
+        # Results and log lines from the workers are applied on the Tk thread
+        self.converting = True
+        self.start_button.config(state="disabled")
+        self.start_ui_queue()
+
         # Start conversion in a new thread
-        thread = threading.Thread(target=self.perform_conversion, args=(self.target_format.get(),))
+        thread = threading.Thread(target=self.perform_conversion, args=(self.options["target_format"],))
         thread.daemon = True
         thread.start()
 
-    def perform_conversion(self, target_format):
-        """Perform the actual video conversion process"""
-        lang = self.language.get()
-        try:
-            self.status.set(LANGUAGES[lang]["conversion_start"])
-            self.log(LANGUAGES[lang]["conversion_start_log"])
+    def cancel_conversion(self):
+        """Cancel the running batch; running ffmpeg processes are stopped and queued files skipped"""
+        if self.converting and self.engine is not None:
+            self.engine.cancel()
 
-            input_folder = self.input_folder.get()
-            output_folder = self.output_folder.get()
-            include_subfolders = self.include_subfolders.get()
-            thread_count = self.thread_count.get()
+    def finish_conversion(self):
+        """Stop refreshing the UI once the batch thread has finished"""
+        self.converting = False
+        self.start_button.config(state="normal")
 
-            # Find video files
-            video_files = self.find_video_files(input_folder, include_subfolders)
+    def record_result(self, success):
+        """Count a finished file"""
+        if success:
+            self.successful_files.set(self.successful_files.get() + 1)
+        else:
+            self.failed_files.set(self.failed_files.get() + 1)
+        self.processed_files.set(self.processed_files.get() + 1)
+        self.update_file_stats()
 
-            self.total_files.set(len(video_files))
+    def update_file_stats(self):
+        """Refresh the file statistics label"""
+        self.file_stats.set(f"Total: {self.total_files.get()} | "
+                            f"Success: {self.successful_files.get()} | "
+                            f"Failed: {self.failed_files.get()}")
 
-            if not video_files:
-                self.status.set(LANGUAGES[lang]["no_video_files"])
-                self.log(LANGUAGES[lang]["no_video_files_msg"].format(input_folder))
-                return
+    def set_total_files(self, count):
+        """Set the number of files found by the scan"""
+        self.total_files.set(count)
+        self.update_file_stats()
 
-            self.log(LANGUAGES[lang]["video_files_found"].format(len(video_files)))
-            self.log(LANGUAGES[lang]["using_threads"].format(thread_count))
-            self.log(LANGUAGES[lang]["target_format"].format(target_format.upper()))
-            self.log(LANGUAGES[lang]["output_directory"].format(output_folder))
-
-            # Create task queue
-            task_queue = queue.Queue()
-
-            # Add all files to the queue
-            for video_file in video_files:
-                task_queue.put((video_file, input_folder, output_folder))
-
-            # Create result queue
-            result_queue = queue.Queue()
-
-            # Start worker threads
-            self.status.set(LANGUAGES[lang]["converting"])
-
-            with ThreadPoolExecutor(max_workers=thread_count) as executor:
-                futures = []
-                for _ in range(thread_count):
-                    future = executor.submit(
-                        self.worker_thread,
-                        task_queue,
-                        result_queue,
-                        self.ffmpeg_path,
-                        target_format
-                    )
-                    futures.append(future)
-
-                # Process results
-                while self.processed_files.get() < self.total_files.get():
-                    if not result_queue.empty():
-                        success = result_queue.get()
-                        if success:
-                            self.successful_files.set(self.successful_files.get() + 1)
-                        else:
-                            self.failed_files.set(self.failed_files.get() + 1)
-                        self.processed_files.set(self.processed_files.get() + 1)
-
-                    # Update progress bar
-                    progress = (self.processed_files.get() / self.total_files.get()) * 100
-                    self.master.master.update_idletasks()
-
-                    # Short sleep to reduce CPU usage
-                    time.sleep(0.1)
-
-            self.status.set(LANGUAGES[lang]["conversion_complete"])
-            messagebox.showinfo(LANGUAGES[lang]["conversion_finished_title"],
-                                LANGUAGES[lang]["conversion_finished_msg"].format(
-                                    self.successful_files.get(),
-                                    self.failed_files.get()
-                                ))
+    def perform_conversion(self, target_format):
+        """Run the conversion engine and report its results to the UI"""
+        options = self.options
+        lang = options["language"]
+        try:
+            self.engine = VideoConversionEngine(
+                self.ffmpeg_path,
+                options,
+                messages=LANGUAGES[lang],
+                log=self.log,
+                on_status=lambda text: self.call_in_ui(self.status.set, text),
+                on_total=lambda count: self.call_in_ui(self.set_total_files, count),
+                on_result=lambda success: self.call_in_ui(self.record_result, success)
+            )
+            self.progress = self.engine.progress
+            succeeded, failed = self.engine.run()
+            if succeeded or failed:
+                self.call_in_ui(self.status.set, LANGUAGES[lang]["conversion_complete"])
+                self.call_in_ui(messagebox.showinfo, LANGUAGES[lang]["conversion_finished_title"],
+                                LANGUAGES[lang]["conversion_finished_msg"].format(succeeded, failed))
         except Exception as e:
-            self.status.set(LANGUAGES[lang]["conversion_failed"])
-            messagebox.showerror(LANGUAGES[lang]["conversion_failed"],
-                                 LANGUAGES[lang]["conversion_failed_msg"] + str(e))
-
-    def find_video_files(self, folder, include_subfolders):
-        """Find all video files in the given folder"""
-        video_extensions = ['.mp4', '.mkv', '.avi', '.mov', '.flv', '.wmv']
-        video_files = []
-        if include_subfolders:
-            for root, dirs, files in os.walk(folder):
-                for file in files:
-                    if any(file.lower().endswith(ext) for ext in video_extensions):
-                        video_files.append(os.path.join(root, file))
-        else:
-            for file in os.listdir(folder):
-                if any(file.lower().endswith(ext) for ext in video_extensions):
-                    video_files.append(os.path.join(folder, file))
-        return video_files
-
-    def worker_thread(self, task_queue, result_queue, ffmpeg_path, target_format):
-        """Worker thread to convert a single video file"""
+            self.call_in_ui(self.status.set, LANGUAGES[lang]["conversion_failed"])
+            self.call_in_ui(messagebox.showerror, LANGUAGES[lang]["conversion_failed"],
+                            LANGUAGES[lang]["conversion_failed_msg"] + str(e))
+        finally:
+            self.call_in_ui(self.finish_conversion)
+
+    def refresh_progress(self):
+        """Show the aggregate progress and the speed and ETA of each running job"""
         lang = self.language.get()
-        while not task_queue.empty():
-            video_file, input_folder, output_folder = task_queue.get()
-            try:
-                self.log(LANGUAGES[lang]["file_conversion_start"].format(video_file))
-                file_name = os.path.basename(video_file)
-                file_base_name = os.path.splitext(file_name)[0]
-                output_file = os.path.join(output_folder, f"{file_base_name}.{target_format}")
-
-                if not self.overwrite_existing.get() and os.path.exists(output_file):
-                    self.log(LANGUAGES[lang]["file_conversion_skip"].format(output_file))
-                    result_queue.put(True)
-                    continue
-
-                command = [
-                    ffmpeg_path,
-                    '-i', video_file,
-                    '-c:v', 'libx264',
-                    '-preset', 'medium',
-                    '-crf', '23',
-                    '-c:a', 'aac',
-                    '-b:a', '128k',
-                    output_file
-                ]
-                subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-                self.log(LANGUAGES[lang]["file_conversion_success"].format(output_file))
-                result_queue.put(True)
-            except (subprocess.SubprocessError, FileNotFoundError) as e:
-                self.log(LANGUAGES[lang]["file_conversion_error"].format(video_file, str(e)))
-                result_queue.put(False)
-            except Exception as e:
-                self.log(LANGUAGES[lang]["unknown_error"].format(video_file, str(e)))
-                result_queue.put(False)
+        fraction, eta, jobs = self.progress.snapshot()
+        self.progress_value.set(fraction * 100)
+        self.progress_text.set(LANGUAGES[lang]["progress_overall"].format(
+            fraction * 100, format_duration(eta) if eta is not None else "-"))
+        self.active_jobs.delete(0, tk.END)
+        for job in jobs:
+            self.active_jobs.insert(tk.END, LANGUAGES[lang]["active_job"].format(
+                job["name"],
+                job["fraction"] * 100,
+                f"{job['fps']:.0f}" if job["fps"] is not None else "-",
+                f"{job['speed']:.2f}" if job["speed"] is not None else "-",
+                format_duration(job["eta"]) if job["eta"] is not None else "-"))
 
     def log(self, message):
-        """Log a message to the log area"""
-        self.log_text.insert(tk.END, message + '\n')
-        self.log_text.see(tk.END)
\ No newline at end of file
+        """Log a message to the log area and the log file; safe to call from any thread"""
+        self.log_sink.write(message)
\ No newline at end of file
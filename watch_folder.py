@@ -0,0 +1,249 @@
+import os
+import sys
+import time
+import ctypes
+import select
+import threading
+import struct
+import ctypes.util
+from file_scanner import DirectorySnapshot, path_excluded, path_selected, scan_files, suffix_set
+
+# Seconds a file's size and mtime must stay unchanged before it is converted
+DEFAULT_STABLE_SECONDS = 10
+
+# How often pending files are checked (and the folder rescanned when polling)
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+# Deletions are reported too, so the tracker can forget removed files
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Report changed files below a folder using Linux inotify through ctypes"""
+
+    def __init__(self, root, recursive=True, exclude=None):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify is not available")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.root = root
+        self.recursive = recursive
+        self.exclude = exclude or []
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches = {}
+        self._add_tree(root)
+
+    def _add_tree(self, path):
+        """Watch a directory (and its subdirectories); returns files already inside"""
+        found = []
+        pending = [path]
+        while pending:
+            directory = pending.pop()
+            relative = os.path.relpath(directory, self.root).replace(os.sep, "/")
+            if relative != "." and path_excluded(relative, self.exclude):
+                continue
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                continue
+            self._watches[wd] = directory
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.recursive:
+                                pending.append(entry.path)
+                        else:
+                            found.append(entry.path)
+            except OSError:
+                continue
+        return found
+
+    def changes(self, timeout):
+        """Wait up to timeout seconds; returns (changed file paths, True if events were lost)"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return [], False
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+
+        changed = []
+        overflow = False
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                # Files may land in a new directory before its watch is in place
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    changed.extend(self._add_tree(path))
+            else:
+                changed.append(path)
+        return changed, overflow
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Report files below a folder by rescanning it; used where inotify is unavailable
+
+    Listings of unchanged directories are kept in an in-memory snapshot, so
+    a rescan only reads directories that changed since the previous one.
+    Files that disappeared since the previous scan are reported as well.
+    """
+
+    def __init__(self, root, recursive=True, exclude=None, suffixes=None):
+        self.root = root
+        self.recursive = recursive
+        self.exclude = exclude or []
+        self.suffixes = suffixes
+        self._snapshot = DirectorySnapshot(":memory:")
+        self._known = set()
+
+    def changes(self, timeout):
+        time.sleep(timeout)
+        found = set(scan_files(self.root, self.suffixes, self.recursive, exclude=self.exclude,
+                               snapshot=self._snapshot))
+        removed = self._known - found
+        self._known = found
+        return list(found | removed), False
+
+    def close(self):
+        self._snapshot.close()
+
+
+def create_watcher(root, recursive=True, exclude=None, suffixes=None):
+    """inotify watcher on Linux, polling watcher elsewhere"""
+    try:
+        return InotifyWatcher(root, recursive, exclude)
+    except (OSError, AttributeError):
+        return PollingWatcher(root, recursive, exclude, suffixes)
+
+
+class StabilityTracker:
+    """Hold back files until their size and mtime stop changing
+
+    A file is released once it has looked the same for stable_seconds,
+    which covers copies over the network that are written in bursts. A
+    released file stays in released until finish() reports its job done;
+    if it changes in the meantime, the new version is only released after
+    that, so two jobs never work on the same file. Finished files are only
+    released again if they change afterwards. Deleted files are forgotten.
+    finish() may be called from any thread.
+    """
+
+    def __init__(self, stable_seconds=DEFAULT_STABLE_SECONDS):
+        self.stable_seconds = stable_seconds
+        self.pending = {}
+        self.released = {}
+        self.finished = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _state(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def observe(self, path, now):
+        """Note a file that was created, changed or deleted"""
+        state = self._state(path)
+        with self._lock:
+            if state is None:
+                self.pending.pop(path, None)
+                self.finished.pop(path, None)
+                return
+            if state == self.released.get(path, self.finished.get(path)):
+                return
+            current = self.pending.get(path)
+            if current is None or current[0] != state:
+                # A file last modified long ago (e.g. present before watching started) is stable already
+                age = max(0.0, time.time() - state[1] / 1e9)
+                self.pending[path] = (state, now - min(age, self.stable_seconds))
+
+    def ready(self, now):
+        """Return the files that have been stable long enough"""
+        ready = []
+        with self._lock:
+            for path, (state, since) in list(self.pending.items()):
+                current = self._state(path)
+                if current is None:
+                    del self.pending[path]
+                    self.finished.pop(path, None)
+                elif current != state:
+                    self.pending[path] = (current, now)
+                elif now - since >= self.stable_seconds and current[0] > 0 and path not in self.released:
+                    del self.pending[path]
+                    self.finished.pop(path, None)
+                    self.released[path] = current
+                    ready.append(path)
+        return ready
+
+    def finish(self, path):
+        """Note that the job of a released file is done, so a newer version may be released"""
+        with self._lock:
+            state = self.released.pop(path, None)
+            if state is not None and state == self._state(path):
+                self.finished[path] = state
+
+
+def watch_files(root, extensions, stop_event, recursive=True, include=None, exclude=None,
+                stable_seconds=DEFAULT_STABLE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL, tracker=None):
+    """Yield files below root once they have stopped changing, until stop_event is set
+
+    Files already in the folder are reported like new ones. Between files
+    the generator yields None about every poll_interval seconds so a
+    consumer can do other work while nothing arrives. A consumer passing
+    its own tracker calls tracker.finish() when a file's job is done;
+    without that a yielded file is never yielded again.
+    """
+    suffixes = extensions if isinstance(extensions, frozenset) else suffix_set(extensions)
+    watcher = create_watcher(root, recursive, exclude, suffixes)
+    if tracker is None:
+        tracker = StabilityTracker(stable_seconds)
+
+    def observe_all(paths):
+        now = time.monotonic()
+        for path in paths:
+            relative = os.path.relpath(path, root).replace(os.sep, "/")
+            if path_selected(relative, suffixes, include, exclude):
+                tracker.observe(path, now)
+
+    try:
+        observe_all(scan_files(root, suffixes, recursive, include, exclude))
+        while not stop_event.is_set():
+            changed, overflow = watcher.changes(poll_interval)
+            if overflow:
+                # The kernel dropped events; a full scan finds whatever was missed
+                changed = scan_files(root, suffixes, recursive, include, exclude)
+            observe_all(changed)
+            for path in tracker.ready(time.monotonic()):
+                yield path
+            yield None
+    finally:
+        watcher.close()